@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import re
 import json
+import mmap
+import os
 from pathlib import Path
 import string
+import sys
 from typing import Callable, Iterable
 
 from .harness import (
@@ -18,6 +22,11 @@ from .harness import (
 from .sanitizers import Sanitizer, SanitizerConfigUnsupported
 from .sanitizers import allowed_attributes_for_tag
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
 
 @dataclass(frozen=True, slots=True)
 class ExpectedTag:
@@ -113,9 +122,9 @@ class BenchCaseResult:
     lossy: bool
     lossy_details: str
     details: str
-    sanitizer_input_html: str
-    sanitized_html: str
-    rendered_html: str
+    sanitizer_input_html: str = ""
+    sanitized_html: str = ""
+    rendered_html: str = ""
 
 
 @dataclass(frozen=True, slots=True)
@@ -530,7 +539,22 @@ def _normalize_expected_tag(tag: str) -> str:
     return f"{parsed.tag}[{', '.join(sorted(parsed.attrs))}]"
 
 
-def load_vectors(paths: Iterable[str | Path]) -> list[Vector]:
+def _read_json_file(path: Path) -> object:
+    # orjson (optional) parses bytes directly and is considerably faster than
+    # the stdlib for the larger vector files.
+    if orjson is not None:
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return orjson.loads(b"")
+            # Parse straight from the page cache instead of copying the file
+            # into a bytes object first.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _load_vector_file(path: Path) -> list[Vector]:
     vectors: list[Vector] = []
 
     allowed_contexts: set[str] = {
@@ -547,181 +571,186 @@ def load_vectors(paths: Iterable[str | Path]) -> list[Vector]:
         "onerror_attr",
     }
 
-    # Duplicate handling:
-    # - Always error on duplicate (id, context).
-    #
-    # Note: payload deduplication is intentionally NOT done here.
-    seen_id_ctx: set[tuple[str, str]] = set()
+    root = _read_json_file(path)
 
-    for raw_path in paths:
-        path = Path(raw_path)
-        root = json.loads(path.read_text(encoding="utf-8"))
+    # Vector file schema (strict):
+    # {"schema": "xssbench.vectorfile.v1", "meta": {...}, "vectors": [...]}
+    if not isinstance(root, dict):
+        raise ValueError(
+            f"Vector file must be a v1 object with schema 'xssbench.vectorfile.v1' (got {type(root)!r}): {path}"
+        )
 
-        # Vector file schema (strict):
-        # {"schema": "xssbench.vectorfile.v1", "meta": {...}, "vectors": [...]}
-        if not isinstance(root, dict):
+    schema = root.get("schema")
+    if schema != "xssbench.vectorfile.v1":
+        raise ValueError(f"Vector file schema must be 'xssbench.vectorfile.v1' (got {schema!r}): {path}")
+
+    if "vectors" not in root:
+        raise ValueError(f"Vector file object must contain a 'vectors' key: {path}")
+
+    options = root.get("options")
+    if options is None:
+        options = {}
+    if not isinstance(options, dict):
+        raise ValueError(f"Vector file 'options' must be a JSON object if present: {path}")
+
+    ignore_expected_tags = options.get("expected_tags") == "ignore"
+
+    data = root["vectors"]
+
+    if not isinstance(data, list):
+        raise ValueError(f"Vector file 'vectors' must be a JSON list: {path}")
+
+    for item in data:
+        if not isinstance(item, dict):
+            raise ValueError(f"Vector items must be JSON objects: {path}")
+        missing = {"id", "description", "payload_html"} - set(item.keys())
+        if missing:
+            raise ValueError(f"Vector missing keys {sorted(missing)}: {path}")
+
+        raw_context = item.get("payload_context")
+        has_expected_tags = "expected_tags" in item
+        raw_expected_tags = item.get("expected_tags")
+
+        has_http_leak_required = "http_leak_required_tags" in item
+
+        has_sanitizer_allow_tags = "sanitizer_allow_tags" in item
+        raw_sanitizer_allow_tags = item.get("sanitizer_allow_tags")
+        has_sanitizer_allow_attrs = "sanitizer_allow_attrs" in item
+
+        if "expected_tags_ordered" in item:
+            raise ValueError(f"expected_tags_ordered is no longer supported; expected_tags are always ordered: {path}")
+        if raw_context is None:
+            contexts: list[str] = ["html"]
+        elif isinstance(raw_context, str):
+            contexts = [raw_context]
+        elif isinstance(raw_context, list):
+            if not raw_context:
+                raise ValueError(f"payload_context list must be non-empty: {path}")
+            if not all(isinstance(x, str) for x in raw_context):
+                raise ValueError(f"payload_context list must contain only strings: {path}")
+            contexts = list(raw_context)
+        else:
             raise ValueError(
-                f"Vector file must be a v1 object with schema 'xssbench.vectorfile.v1' (got {type(root)!r}): {path}"
+                f"payload_context must be a string or list of strings (got {type(raw_context)!r}): {path}"
             )
 
-        schema = root.get("schema")
-        if schema != "xssbench.vectorfile.v1":
-            raise ValueError(f"Vector file schema must be 'xssbench.vectorfile.v1' (got {schema!r}): {path}")
-
-        if "vectors" not in root:
-            raise ValueError(f"Vector file object must contain a 'vectors' key: {path}")
-
-        options = root.get("options")
-        if options is None:
-            options = {}
-        if not isinstance(options, dict):
-            raise ValueError(f"Vector file 'options' must be a JSON object if present: {path}")
-
-        ignore_expected_tags = options.get("expected_tags") == "ignore"
-
-        data = root["vectors"]
-
-        if not isinstance(data, list):
-            raise ValueError(f"Vector file 'vectors' must be a JSON list: {path}")
-
-        for item in data:
-            if not isinstance(item, dict):
-                raise ValueError(f"Vector items must be JSON objects: {path}")
-            missing = {"id", "description", "payload_html"} - set(item.keys())
-            if missing:
-                raise ValueError(f"Vector missing keys {sorted(missing)}: {path}")
+        for payload_context in contexts:
+            # Interned so per-vector context comparisons and lookups hit the identity fast path.
+            payload_context = sys.intern(str(payload_context))
+            if payload_context not in allowed_contexts:
+                raise ValueError(
+                    f"Invalid payload_context {payload_context!r} in {path}. Allowed: {sorted(allowed_contexts)}"
+                )
 
-            raw_context = item.get("payload_context")
-            has_expected_tags = "expected_tags" in item
-            raw_expected_tags = item.get("expected_tags")
+            vector_id = str(item["id"])
 
-            has_http_leak_required = "http_leak_required_tags" in item
+            payload_html = str(item["payload_html"])
 
-            has_sanitizer_allow_tags = "sanitizer_allow_tags" in item
-            raw_sanitizer_allow_tags = item.get("sanitizer_allow_tags")
-            has_sanitizer_allow_attrs = "sanitizer_allow_attrs" in item
+            expected_tags: tuple[ExpectedTag, ...] | None = ()
+            if _expected_tags_allowed_for_context(payload_context):
+                if ignore_expected_tags:
+                    expected_tags = None
+                else:
+                    if not has_expected_tags:
+                        raise ValueError(f"expected_tags is required for payload_context {payload_context!r}: {path}")
+                    if not isinstance(raw_expected_tags, list):
+                        raise ValueError(
+                            f"expected_tags must be a list of strings (got {type(raw_expected_tags)!r}): {path}"
+                        )
+                    if not all(isinstance(x, str) for x in raw_expected_tags):
+                        raise ValueError(f"expected_tags must contain only strings: {path}")
 
-            if "expected_tags_ordered" in item:
-                raise ValueError(
-                    f"expected_tags_ordered is no longer supported; expected_tags are always ordered: {path}"
-                )
-            if raw_context is None:
-                contexts: list[str] = ["html"]
-            elif isinstance(raw_context, str):
-                contexts = [raw_context]
-            elif isinstance(raw_context, list):
-                if not raw_context:
-                    raise ValueError(f"payload_context list must be non-empty: {path}")
-                if not all(isinstance(x, str) for x in raw_context):
-                    raise ValueError(f"payload_context list must contain only strings: {path}")
-                contexts = list(raw_context)
+                    if len(raw_expected_tags) == 0:
+                        expected_tags = ()
+                    else:
+                        expected_tags = tuple(_parse_expected_tag_spec(x) for x in raw_expected_tags)
             else:
-                raise ValueError(
-                    f"payload_context must be a string or list of strings (got {type(raw_context)!r}): {path}"
-                )
+                if has_expected_tags:
+                    raise ValueError(f"expected_tags is not allowed for payload_context {payload_context!r}: {path}")
 
-            for payload_context in contexts:
-                payload_context = str(payload_context)
-                if payload_context not in allowed_contexts:
+            sanitizer_allow_tags: tuple[ExpectedTag, ...] = ()
+            if payload_context in ("http_leak", "http_leak_style"):
+                if has_http_leak_required:
                     raise ValueError(
-                        f"Invalid payload_context {payload_context!r} in {path}. Allowed: {sorted(allowed_contexts)}"
+                        f"http_leak_required_tags is no longer supported; use sanitizer_allow_tags instead: {path}"
                     )
 
-                vector_id = str(item["id"])
-                id_key = (vector_id, payload_context)
-                if id_key in seen_id_ctx:
-                    raise ValueError(f"Duplicate vector id+context: {vector_id}@{payload_context}")
-                seen_id_ctx.add(id_key)
-
-                payload_html = str(item["payload_html"])
-
-                expected_tags: tuple[ExpectedTag, ...] | None = ()
-                if _expected_tags_allowed_for_context(payload_context):
-                    if ignore_expected_tags:
-                        expected_tags = None
-                    else:
-                        if not has_expected_tags:
-                            raise ValueError(
-                                f"expected_tags is required for payload_context {payload_context!r}: {path}"
-                            )
-                        if not isinstance(raw_expected_tags, list):
-                            raise ValueError(
-                                f"expected_tags must be a list of strings (got {type(raw_expected_tags)!r}): {path}"
-                            )
-                        if not all(isinstance(x, str) for x in raw_expected_tags):
-                            raise ValueError(f"expected_tags must contain only strings: {path}")
+                if has_sanitizer_allow_attrs:
+                    raise ValueError(
+                        f"sanitizer_allow_attrs is no longer supported; encode attrs in sanitizer_allow_tags like 'base[href]': {path}"
+                    )
 
-                        if len(raw_expected_tags) == 0:
-                            expected_tags = ()
-                        else:
-                            expected_tags = tuple(_parse_expected_tag_spec(x) for x in raw_expected_tags)
-                else:
-                    if has_expected_tags:
-                        raise ValueError(
-                            f"expected_tags is not allowed for payload_context {payload_context!r}: {path}"
-                        )
+                if not has_sanitizer_allow_tags:
+                    raise ValueError(
+                        f"sanitizer_allow_tags is required for payload_context {payload_context!r}: {path}"
+                    )
 
-                sanitizer_allow_tags: tuple[ExpectedTag, ...] = ()
-                if payload_context in ("http_leak", "http_leak_style"):
-                    if has_http_leak_required:
-                        raise ValueError(
-                            f"http_leak_required_tags is no longer supported; use sanitizer_allow_tags instead: {path}"
-                        )
+                if not isinstance(raw_sanitizer_allow_tags, list) or not all(
+                    isinstance(x, str) for x in raw_sanitizer_allow_tags
+                ):
+                    raise ValueError(
+                        f"sanitizer_allow_tags must be a list of strings (got {type(raw_sanitizer_allow_tags)!r}): {path}"
+                    )
+                if len(raw_sanitizer_allow_tags) == 0:
+                    raise ValueError(
+                        f"sanitizer_allow_tags must be non-empty for payload_context {payload_context!r}: {path}"
+                    )
 
-                    if has_sanitizer_allow_attrs:
-                        raise ValueError(
-                            f"sanitizer_allow_attrs is no longer supported; encode attrs in sanitizer_allow_tags like 'base[href]': {path}"
-                        )
+                sanitizer_allow_tags = tuple(_parse_sanitizer_allow_tag_spec(x) for x in raw_sanitizer_allow_tags)
+            else:
+                # Generic Context (html, html_head, etc)
+                # We allow sanitizer overrides here too, to support vectors that require specific
+                # properties (like CSS) that are not in the default shared policy but considered safe
+                # for that specific test case (e.g. to avoid Lossy results on safe keyframes).
 
-                    if not has_sanitizer_allow_tags:
-                        raise ValueError(
-                            f"sanitizer_allow_tags is required for payload_context {payload_context!r}: {path}"
-                        )
+                if has_sanitizer_allow_attrs:
+                    raise ValueError(
+                        f"sanitizer_allow_attrs is no longer supported; encode attrs in sanitizer_allow_tags like 'base[href]': {path}"
+                    )
 
+                if has_sanitizer_allow_tags:
                     if not isinstance(raw_sanitizer_allow_tags, list) or not all(
                         isinstance(x, str) for x in raw_sanitizer_allow_tags
                     ):
                         raise ValueError(
                             f"sanitizer_allow_tags must be a list of strings (got {type(raw_sanitizer_allow_tags)!r}): {path}"
                         )
-                    if len(raw_sanitizer_allow_tags) == 0:
-                        raise ValueError(
-                            f"sanitizer_allow_tags must be non-empty for payload_context {payload_context!r}: {path}"
-                        )
-
                     sanitizer_allow_tags = tuple(_parse_sanitizer_allow_tag_spec(x) for x in raw_sanitizer_allow_tags)
-                else:
-                    # Generic Context (html, html_head, etc)
-                    # We allow sanitizer overrides here too, to support vectors that require specific
-                    # properties (like CSS) that are not in the default shared policy but considered safe
-                    # for that specific test case (e.g. to avoid Lossy results on safe keyframes).
 
-                    if has_sanitizer_allow_attrs:
-                        raise ValueError(
-                            f"sanitizer_allow_attrs is no longer supported; encode attrs in sanitizer_allow_tags like 'base[href]': {path}"
-                        )
+            vectors.append(
+                Vector(
+                    id=vector_id,
+                    description=str(item["description"]),
+                    payload_html=payload_html,
+                    payload_context=payload_context,  # type: ignore[arg-type]
+                    expected_tags=expected_tags,
+                    sanitizer_allow_tags=sanitizer_allow_tags,
+                )
+            )
 
-                    if has_sanitizer_allow_tags:
-                        if not isinstance(raw_sanitizer_allow_tags, list) or not all(
-                            isinstance(x, str) for x in raw_sanitizer_allow_tags
-                        ):
-                            raise ValueError(
-                                f"sanitizer_allow_tags must be a list of strings (got {type(raw_sanitizer_allow_tags)!r}): {path}"
-                            )
-                        sanitizer_allow_tags = tuple(
-                            _parse_sanitizer_allow_tag_spec(x) for x in raw_sanitizer_allow_tags
-                        )
+    return vectors
 
-                vectors.append(
-                    Vector(
-                        id=vector_id,
-                        description=str(item["description"]),
-                        payload_html=payload_html,
-                        payload_context=payload_context,  # type: ignore[arg-type]
-                        expected_tags=expected_tags,
-                        sanitizer_allow_tags=sanitizer_allow_tags,
-                    )
-                )
+
+def load_vectors(paths: Iterable[str | Path]) -> list[Vector]:
+    resolved = [Path(p) for p in paths]
+
+    # Duplicate handling:
+    # - Always error on duplicate (id, context).
+    #
+    # Note: payload deduplication is intentionally NOT done here.
+    seen_id_ctx: dict[str, set[str]] = {}
+    vectors: list[Vector] = []
+
+    # Read/parse files concurrently, then check duplicates over the results in
+    # input order so the output (and the first reported error) is deterministic.
+    with ThreadPoolExecutor(max_workers=max(1, min(len(resolved), os.cpu_count() or 1))) as pool:
+        for file_vectors in pool.map(_load_vector_file, resolved):
+            for v in file_vectors:
+                seen_ctx = seen_id_ctx.setdefault(v.id, set())
+                if v.payload_context in seen_ctx:
+                    raise ValueError(f"Duplicate vector id+context: {v.id}@{v.payload_context}")
+                seen_ctx.add(v.payload_context)
+                vectors.append(v)
 
     return vectors
 
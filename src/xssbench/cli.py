@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import argparse
 from contextlib import ExitStack
+import hashlib
+from importlib import metadata
 import json
+import marshal
 import math
 import multiprocessing
+import os
 from pathlib import Path
 import sys
 import threading
@@ -12,11 +16,19 @@ import time
 import re
 import queue
 
-from .bench import BenchCaseResult, load_vectors, run_bench, sanitizer_overrides_for_vector
+from . import bench as bench_module
+from . import sanitizers as sanitizers_module
+from .bench import BenchCaseResult, BenchSummary, ExpectedTag, Vector, load_vectors, run_bench
+from .bench import sanitizer_overrides_for_vector
 from .harness import BrowserName
 from .portswigger import ensure_portswigger_vectors_file
 from .sanitizers import SanitizerConfigUnsupported, available_sanitizers, default_sanitizers, get_sanitizer
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
 
 _WORKER_VECTOR_PATHS: tuple[str, ...] | None = None
 _WORKER_VECTORS = None
@@ -51,6 +63,127 @@ def _select_vectors_by_id(vectors, ids: list[str]):
     return out, missing
 
 
+# Bump when the cached representation (or load_vectors semantics) changes.
+_VECTOR_CACHE_VERSION = 1
+
+
+def _package_version() -> str:
+    try:
+        return metadata.version("justhtml-xss-bench")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _vector_cache_key(vector_paths: list[str]) -> str:
+    # Key on the input files plus the modules load_vectors validates against
+    # (bench.py, and sanitizers.py for the expected_tags attribute policy), so
+    # edits to the vectors or the validation logic invalidate the cache.
+    parts = [f"v{_VECTOR_CACHE_VERSION}", _package_version()]
+    for p in [*vector_paths, bench_module.__file__, sanitizers_module.__file__]:
+        st = os.stat(p)
+        parts.append(f"{os.path.abspath(p)}:{st.st_mtime_ns}:{st.st_size}")
+    return hashlib.blake2b(";".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _vector_cache_dir(repo_root: Path) -> Path:
+    # Next to the PortSwigger vendor checkout, under the git-ignored `.xssbench/`.
+    return repo_root / ".xssbench" / "compiled"
+
+
+def _load_vectors_cached(vector_paths: list[str], *, cache_dir: Path) -> list[Vector]:
+    """Like `load_vectors`, but reuse a marshal cache in `cache_dir`.
+
+    Any problem with the cache (missing, stale, unreadable) falls back to
+    `load_vectors`; the cache is purely an optimization.
+    """
+
+    try:
+        cache_path = cache_dir / f"{_vector_cache_key(vector_paths)}.marshal"
+    except OSError:
+        return load_vectors(vector_paths)
+
+    try:
+        rows = marshal.loads(cache_path.read_bytes())
+        return [
+            Vector(
+                id=vid,
+                description=description,
+                payload_html=payload_html,
+                payload_context=payload_context,
+                expected_tags=None if expected is None else tuple(ExpectedTag(*t) for t in expected),
+                sanitizer_allow_tags=tuple(ExpectedTag(*t) for t in allow),
+            )
+            for vid, description, payload_html, payload_context, expected, allow in rows
+        ]
+    except Exception:
+        pass
+
+    vectors = load_vectors(vector_paths)
+
+    rows = [
+        (
+            v.id,
+            v.description,
+            v.payload_html,
+            v.payload_context,
+            None if v.expected_tags is None else tuple((t.tag, t.attrs, t.allowed_styles) for t in v.expected_tags),
+            tuple((t.tag, t.attrs, t.allowed_styles) for t in v.sanitizer_allow_tags),
+        )
+        for v in vectors
+    ]
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write atomically: parallel workers may read the cache concurrently.
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(marshal.dumps(rows))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        return vectors
+
+    # Each key gets its own file; drop the ones left behind by earlier inputs
+    # so the directory holds a single copy of the corpus.
+    for old_path in cache_dir.glob("*.marshal"):
+        if old_path != cache_path:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+
+    return vectors
+
+
+def _cpu_budget() -> int:
+    # Respect CPU affinity (taskset/containers) where the platform exposes it.
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+# orjson writes everything outside printable ASCII raw; the stdlib's default
+# (ensure_ascii=True) escapes it, and --json-out has always been written that way.
+_JSON_NON_ASCII_RE = re.compile(r"[^\x00-\x7e]+")
+
+
+def _escape_json_non_ascii(m: re.Match[str]) -> str:
+    # Such characters only occur inside JSON strings, so the stdlib's string
+    # escaper can be applied to each run in place (minus the added quotes).
+    return json.encoder.encode_basestring_ascii(m.group())[1:-1]
+
+
+def _dump_json_bytes(payload: object) -> bytes:
+    if orjson is not None:
+        try:
+            data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            # e.g. lone surrogates in sanitizer output; the stdlib escapes those.
+            pass
+        else:
+            if data.isascii():
+                return data
+            return _JSON_NON_ASCII_RE.sub(_escape_json_non_ascii, data.decode("utf-8")).encode("ascii")
+    return (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+
+
 def _worker_init(vector_paths: list[str]) -> None:
     global _WORKER_VECTOR_PATHS, _WORKER_VECTORS
     _WORKER_VECTOR_PATHS = tuple(vector_paths)
@@ -89,6 +222,7 @@ def _worker_run(
 def _queue_worker_main(
     *,
     vector_paths: list[str],
+    vector_cache_dir: str,
     vector_ids: list[str] | None,
     sanitizer_names: list[str],
     browsers: list[BrowserName],
@@ -166,7 +300,7 @@ def _queue_worker_main(
         )
 
     async def _async_main() -> None:
-        vectors = load_vectors(vector_paths)
+        vectors = _load_vectors_cached(vector_paths, cache_dir=Path(vector_cache_dir))
         if vector_ids:
             vectors, missing = _select_vectors_by_id(vectors, vector_ids)
             if missing:
@@ -504,7 +638,7 @@ def _parse_run_args(argv: list[str]) -> argparse.Namespace:
         "--workers",
         type=int,
         default=1,
-        help="Run in parallel using N worker processes (default: 1)",
+        help="Run in parallel using N worker processes (default: 1; capped by available CPUs per browser)",
     )
 
     parser.add_argument(
@@ -539,12 +673,30 @@ def _parse_run_args(argv: list[str]) -> argparse.Namespace:
 
 
 def _repr_truncated(value: str, *, limit: int = 400) -> str:
+    # Slice before repr() to avoid repr-ing (and copying) the whole value. The
+    # truncated repr is approximate: repr() picks its quote character and escaping
+    # from the whole string it is given, so a long value can render differently
+    # than a full repr() cut to `limit` would.
+    if len(value) > limit:
+        value = value[: max(0, limit)]
     s = repr(value)
     if len(s) <= limit:
         return s
     return s[: max(0, limit - 3)] + "..."
 
 
+def _write_fail_fast(hit: BenchCaseResult, *, sanitized_html_limit: int) -> None:
+    # One write + flush for the whole block, so it is not interleaved with
+    # other stderr output.
+    lines = [f"FAIL-FAST: {hit.sanitizer} / {hit.browser} / {hit.vector_id} ({hit.payload_context}): {hit.details}"]
+    if hit.sanitized_html:
+        lines.append(f"sanitized_html={_repr_truncated(hit.sanitized_html, limit=sanitized_html_limit)}")
+    if hit.sanitizer_input_html:
+        lines.append(f"sanitizer_input_html={_repr_truncated(hit.sanitizer_input_html, limit=2000)}")
+    sys.stderr.write("\n".join(lines) + "\n")
+    sys.stderr.flush()
+
+
 def _print_table(summary) -> None:
     def _is_js_context(ctx: str) -> bool:
         c = str(ctx)
@@ -579,14 +731,14 @@ def _print_table(summary) -> None:
 
         if r.outcome == "xss":
             row["xss"] += 1
-        if bool(getattr(r, "lossy", False)):
+        if r.lossy:
             row["lossy"] += 1
         if r.outcome == "error":
             row["errors"] += 1
-        if r.outcome == "pass" and not bool(getattr(r, "lossy", False)):
+        if r.outcome == "pass" and not r.lossy:
             row["passed"] += 1
 
-        ctx = str(getattr(r, "payload_context", ""))
+        ctx = str(r.payload_context)
         if _is_js_context(ctx):
             row["js_total"] += 1
             row["js_skipped"] += 1 if r.outcome == "skip" else 0
@@ -603,55 +755,59 @@ def _print_table(summary) -> None:
     xss = [r for r in summary.results if r.outcome == "xss"]
     http_leak = [r for r in summary.results if r.outcome == "http_leak"]
     errors = [r for r in summary.results if r.outcome == "error"]
-    lossy = [r for r in summary.results if getattr(r, "lossy", False)]
+    lossy = [r for r in summary.results if r.lossy]
+
+    # Collect all output lines and write them once at the end; large runs can
+    # produce thousands of lines.
+    out: list[str] = []
 
     # Put detailed output first; print the summary table last.
     if xss:
-        print("XSS:")
+        out.append("XSS:")
         for r in xss:
-            print(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
-            if getattr(r, "sanitizer_input_html", ""):
-                print(f"  sanitizer_input_html={_repr_truncated(getattr(r, 'sanitizer_input_html'))}")
+            out.append(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
+            if r.sanitizer_input_html:
+                out.append(f"  sanitizer_input_html={_repr_truncated(r.sanitizer_input_html)}")
             if r.sanitized_html:
-                print(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
+                out.append(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
 
     if http_leak:
         if xss:
-            print("")
-        print("HTTP leaks (non-script external fetches):")
+            out.append("")
+        out.append("HTTP leaks (non-script external fetches):")
         for r in http_leak:
-            print(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
-            if getattr(r, "sanitizer_input_html", ""):
-                print(f"  sanitizer_input_html={_repr_truncated(getattr(r, 'sanitizer_input_html'))}")
+            out.append(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
+            if r.sanitizer_input_html:
+                out.append(f"  sanitizer_input_html={_repr_truncated(r.sanitizer_input_html)}")
             if r.sanitized_html:
-                print(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
+                out.append(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
 
     if errors:
         if xss or http_leak:
-            print("")
-        print("Errors:")
+            out.append("")
+        out.append("Errors:")
         for r in errors:
-            print(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
-            if getattr(r, "sanitizer_input_html", ""):
-                print(f"  sanitizer_input_html={_repr_truncated(getattr(r, 'sanitizer_input_html'))}")
+            out.append(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {r.details}")
+            if r.sanitizer_input_html:
+                out.append(f"  sanitizer_input_html={_repr_truncated(r.sanitizer_input_html)}")
             if r.sanitized_html:
-                print(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
+                out.append(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
 
     if lossy:
         if xss or http_leak or errors:
-            print("")
-        print("Lossy (expected tags stripped):")
+            out.append("")
+        out.append("Lossy (expected tags stripped):")
         for r in lossy:
-            msg = getattr(r, "lossy_details", "") or "(lossy)"
-            print(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {msg}")
-            if getattr(r, "sanitizer_input_html", ""):
-                print(f"  sanitizer_input_html={_repr_truncated(getattr(r, 'sanitizer_input_html'))}")
+            msg = r.lossy_details or "(lossy)"
+            out.append(f"- {r.sanitizer} / {r.browser} / {r.vector_id} ({r.payload_context}): {msg}")
+            if r.sanitizer_input_html:
+                out.append(f"  sanitizer_input_html={_repr_truncated(r.sanitizer_input_html)}")
             # Always print sanitized_html for lossy cases, even if it's empty.
             # An empty string is often the most important signal when debugging.
-            print(f"  sanitized_html={_repr_truncated(getattr(r, 'sanitized_html', ''))}")
+            out.append(f"  sanitized_html={_repr_truncated(r.sanitized_html)}")
 
     if xss or http_leak or errors or lossy:
-        print("")
+        out.append("")
 
     header = (
         f"{'sanitizer':<22}  {'browser':<8}"
@@ -659,18 +815,19 @@ def _print_table(summary) -> None:
         f"  {'js':>6}  {'href':>6}  {'http_leak':>9}"
         f"  {'passed':>6}"
     )
-    print(header)
-    print("-" * len(header))
+
+    def _skip_or_num(*, total: int, skipped: int, value: int) -> str:
+        if total == 0:
+            return "-"
+        if skipped == total:
+            return "skip"
+        return str(value)
+
+    out.append(header)
+    out.append("-" * len(header))
     for name, browser in sorted(per.keys()):
         row = per[(name, browser)]
 
-        def _skip_or_num(*, total: int, skipped: int, value: int) -> str:
-            if total == 0:
-                return "-"
-            if skipped == total:
-                return "skip"
-            return str(value)
-
         js_cell = _skip_or_num(total=int(row["js_total"]), skipped=int(row["js_skipped"]), value=int(row["js_xss"]))
         href_cell = _skip_or_num(
             total=int(row["href_total"]), skipped=int(row["href_skipped"]), value=int(row["href_xss"])
@@ -681,13 +838,15 @@ def _print_table(summary) -> None:
             value=int(row["http_leak_hits"]),
         )
 
-        print(
+        out.append(
             f"{name:<22}  {browser:<8}"
             f"  {row['xss']:>6}  {row['lossy']:>6}  {row['errors']:>6}"
             f"  {js_cell:>6}  {href_cell:>6}  {http_leak_cell:>9}"
             f"  {row['passed']:>6}"
         )
 
+    sys.stdout.write("\n".join(out) + "\n")
+
 
 def main(argv: list[str] | None = None) -> int:
     argv = sys.argv[1:] if argv is None else argv
@@ -710,10 +869,11 @@ def main(argv: list[str] | None = None) -> int:
 
     # First-run convenience: fetch PortSwigger cheat sheet data and generate a
     # refs-only artifact under `.xssbench/` (git-ignored). Best-effort only.
+    #
+    # Write run artifacts under the current directory.
+    # When installed via pip, `__file__` may live in site-packages.
+    repo_root = Path.cwd()
     try:
-        # Write run artifacts under the current directory.
-        # When installed via pip, `__file__` may live in site-packages.
-        repo_root = Path.cwd()
         ensure_portswigger_vectors_file(repo_root=repo_root, against_paths=vector_paths)
     except Exception as exc:
         print(
@@ -721,7 +881,8 @@ def main(argv: list[str] | None = None) -> int:
             file=sys.stderr,
         )
 
-    vectors = load_vectors(vector_paths)
+    vector_cache_dir = _vector_cache_dir(repo_root)
+    vectors = _load_vectors_cached(vector_paths, cache_dir=vector_cache_dir)
     vector_ids = _normalize_id_args(args.ids) if args.ids else None
     if vector_ids:
         vectors, missing = _select_vectors_by_id(vectors, vector_ids)
@@ -762,7 +923,7 @@ def main(argv: list[str] | None = None) -> int:
             if args.progress_every == 1:
                 if result.outcome == "error":
                     ch = "E"
-                elif getattr(result, "lossy", False):
+                elif result.lossy:
                     ch = "L"
                 elif result.executed:
                     ch = "X"
@@ -800,7 +961,18 @@ def main(argv: list[str] | None = None) -> int:
 
             # Global queue: each worker pulls the next vector batch when ready.
             # This keeps progress flowing and avoids waiting for one huge slice.
-            actual_workers = min(workers, n) if n > 0 else 1
+            #
+            # Each worker drives its own browser(s), and every browser is itself
+            # several OS processes, so don't run more workers than CPUs allow.
+            cpu_budget = max(1, _cpu_budget() // max(1, len(browsers)))
+            actual_workers = min(workers, n, cpu_budget) if n > 0 else 1
+            if workers > cpu_budget and n > cpu_budget:
+                print(
+                    f"warning: limiting --workers {workers} to {actual_workers} "
+                    f"({_cpu_budget()} CPUs available, {len(browsers)} browser(s) per worker)",
+                    file=sys.stderr,
+                    flush=True,
+                )
 
             cases_per_vector = max(1, len(sanitizers) * len(browsers))
             vectors_per_task = 1
@@ -839,6 +1011,7 @@ def main(argv: list[str] | None = None) -> int:
                     target=_queue_worker_main,
                     kwargs={
                         "vector_paths": list(vector_paths),
+                        "vector_cache_dir": str(vector_cache_dir),
                         "vector_ids": list(vector_ids) if vector_ids else None,
                         "sanitizer_names": sanitizer_names,
                         "browsers": list(browsers),
@@ -987,23 +1160,7 @@ def main(argv: list[str] | None = None) -> int:
                 if args.fail_fast and hit_xss:
                     hit = next((r for r in part if r.outcome == "xss"), None)
                     if hit is not None:
-                        print(
-                            f"FAIL-FAST: {hit.sanitizer} / {hit.browser} / {hit.vector_id} ({hit.payload_context}): {hit.details}",
-                            file=sys.stderr,
-                            flush=True,
-                        )
-                        if hit.sanitized_html:
-                            print(
-                                f"sanitized_html={_repr_truncated(hit.sanitized_html)}",
-                                file=sys.stderr,
-                                flush=True,
-                            )
-                        if getattr(hit, "sanitizer_input_html", ""):
-                            print(
-                                f"sanitizer_input_html={_repr_truncated(getattr(hit, 'sanitizer_input_html'), limit=2000)}",
-                                file=sys.stderr,
-                                flush=True,
-                            )
+                        _write_fail_fast(hit, sanitized_html_limit=400)
                     stop_event.set()
                     break
 
@@ -1011,8 +1168,11 @@ def main(argv: list[str] | None = None) -> int:
 
                 if not args.no_progress and args.progress_every > 0 and part:
                     done_cases += len(part)
-                    errors_so_far += sum(1 for r in part if r.outcome == "error")
-                    xss_so_far += sum(1 for r in part if r.executed and r.outcome != "error")
+                    for r in part:
+                        if r.outcome == "error":
+                            errors_so_far += 1
+                        elif r.executed:
+                            xss_so_far += 1
 
                     every = 1 if args.progress_every == 1 else args.progress_every
                     bucket = done_cases // every
@@ -1041,18 +1201,14 @@ def main(argv: list[str] | None = None) -> int:
                     p.terminate()
                     p.join(timeout=2)
 
-            summary = type(
-                "Summary",
-                (),
-                {
-                    "total_cases": len(results),
-                    "total_executed": sum(1 for r in results if r.executed),
-                    "total_external": sum(1 for r in results if r.outcome == "http_leak"),
-                    "total_errors": sum(1 for r in results if r.outcome == "error"),
-                    "total_lossy": sum(1 for r in results if getattr(r, "lossy", False)),
-                    "results": results,
-                },
-            )()
+            summary = BenchSummary(
+                total_cases=len(results),
+                total_executed=sum(1 for r in results if r.executed),
+                total_external=sum(1 for r in results if r.outcome == "http_leak"),
+                total_errors=sum(1 for r in results if r.outcome == "error"),
+                total_lossy=sum(1 for r in results if r.lossy),
+                results=results,
+            )
         else:
             summary = run_bench(
                 vectors=vectors,
@@ -1070,23 +1226,7 @@ def main(argv: list[str] | None = None) -> int:
     if args.fail_fast and summary.total_executed > 0:
         hit = next((r for r in summary.results if r.outcome == "xss"), None)
         if hit is not None:
-            print(
-                f"FAIL-FAST: {hit.sanitizer} / {hit.browser} / {hit.vector_id} ({hit.payload_context}): {hit.details}",
-                file=sys.stderr,
-                flush=True,
-            )
-            if hit.sanitized_html:
-                print(
-                    f"sanitized_html={_repr_truncated(hit.sanitized_html, limit=2000)}",
-                    file=sys.stderr,
-                    flush=True,
-                )
-            if getattr(hit, "sanitizer_input_html", ""):
-                print(
-                    f"sanitizer_input_html={_repr_truncated(getattr(hit, 'sanitizer_input_html'), limit=2000)}",
-                    file=sys.stderr,
-                    flush=True,
-                )
+            _write_fail_fast(hit, sanitized_html_limit=2000)
         return 1
 
     _print_table(summary)
@@ -1097,38 +1237,40 @@ def main(argv: list[str] | None = None) -> int:
         # and auto-create parent directories.
         if out_path.suffix == "" or (out_path.exists() and out_path.is_dir()):
             out_path = out_path / "results.json"
+        # Keys are listed in sorted order so the output matches what
+        # sort_keys=True used to produce without sorting every result row.
         payload = {
-            "total_cases": summary.total_cases,
-            "total_executed": summary.total_executed,
-            # Backwards-compatible key (previously named 'external').
-            "total_external": getattr(summary, "total_external", 0),
-            # Preferred name.
-            "total_http_leak": getattr(summary, "total_external", 0),
-            "total_errors": summary.total_errors,
-            "total_lossy": getattr(summary, "total_lossy", 0),
             "results": [
                 {
-                    "sanitizer": r.sanitizer,
                     "browser": r.browser,
-                    "vector_id": r.vector_id,
-                    "payload_context": r.payload_context,
-                    "run_payload_context": getattr(r, "run_payload_context", r.payload_context),
-                    "outcome": r.outcome,
-                    "executed": r.executed,
-                    "lossy": getattr(r, "lossy", False),
-                    "lossy_details": getattr(r, "lossy_details", ""),
                     "details": r.details,
-                    "sanitizer_input_html": getattr(r, "sanitizer_input_html", ""),
+                    "executed": r.executed,
+                    "lossy": r.lossy,
+                    "lossy_details": r.lossy_details,
+                    "outcome": r.outcome,
+                    "payload_context": r.payload_context,
+                    "rendered_html": r.rendered_html,
+                    "run_payload_context": r.run_payload_context or r.payload_context,
                     "sanitized_html": r.sanitized_html,
-                    "rendered_html": getattr(r, "rendered_html", ""),
+                    "sanitizer": r.sanitizer,
+                    "sanitizer_input_html": r.sanitizer_input_html,
+                    "vector_id": r.vector_id,
                 }
                 for r in summary.results
             ],
+            "total_cases": summary.total_cases,
+            "total_errors": summary.total_errors,
+            "total_executed": summary.total_executed,
+            # Backwards-compatible key (previously named 'external').
+            "total_external": summary.total_external,
+            # Preferred name.
+            "total_http_leak": summary.total_external,
+            "total_lossy": summary.total_lossy,
         }
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        out_path.write_bytes(_dump_json_bytes(payload))
 
-    if summary.total_errors > 0 or getattr(summary, "total_lossy", 0) > 0:
+    if summary.total_errors > 0 or summary.total_lossy > 0:
         return 2
     return 1 if summary.total_executed > 0 else 0
 
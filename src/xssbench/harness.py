@@ -10,19 +10,56 @@ import signal
 import threading
 import time
 from typing import Any
+from typing import Callable
+from typing import cast
 from typing import Literal
-from urllib.parse import urlsplit
+from typing import Sequence
 
 
 _MAX_PLAYWRIGHT_TIMEOUT_MS = 5000
 
 
-_META_REFRESH_CONTENT_RE = re.compile(
-    r"^\s*(?P<delay>\d+)?\s*(?:;\s*)?(?:url\s*=\s*(?P<url>.+?))?\s*$",
+# Cheap gate: a prefix of _META_REFRESH_TAG_RE, so anything the rewrite could
+# touch matches this too.
+_META_REFRESH_PRESENT_RE = re.compile(r"<meta\b[^>]*\bhttp-equiv\s*=\s*['\"]?refresh", flags=re.IGNORECASE)
+
+_META_REFRESH_TAG_RE = re.compile(
+    r"(<meta\b[^>]*\bhttp-equiv\s*=\s*['\"]?refresh['\"]?[^>]*\bcontent\s*=\s*['\"])([^'\"]*)(['\"])",
     flags=re.IGNORECASE,
 )
 
 
+def _meta_refresh_url(content: str) -> str | None:
+    """Parse a meta refresh `content` value like `10; url=...`.
+
+    Returns the (possibly empty) URL, or None if the value is not in that form.
+    """
+
+    s = content.lstrip()
+    i = 0
+    n = len(s)
+    while i < n and s[i].isdecimal():
+        i += 1
+    rest = s[i:].lstrip()
+    if rest.startswith(";"):
+        rest = rest[1:].lstrip()
+    if not rest:
+        return ""
+    if rest[:3].lower() != "url":
+        return None
+    rest = rest[3:].lstrip()
+    if not rest.startswith("="):
+        return None
+    rest = rest[1:]
+    url = rest.strip()
+    # The URL runs to the end of the value and may not span lines. A value that
+    # is only whitespace after `=` still counts as an (empty) URL unless it is
+    # nothing but newlines.
+    if "\n" in url or not rest.strip("\n"):
+        return None
+    return url
+
+
 def _speed_up_meta_refresh(html: str, *, max_delay_s: int = 0) -> str:
     """Reduce meta refresh delays inside already-sanitized HTML.
 
@@ -30,17 +67,16 @@ def _speed_up_meta_refresh(html: str, *, max_delay_s: int = 0) -> str:
     but we don't want a 10s refresh to force a 10s timeout.
     """
 
-    if "http-equiv" not in html.lower() or "refresh" not in html.lower():
+    if not _META_REFRESH_PRESENT_RE.search(html):
         return html
 
     def _repl(m: re.Match[str]) -> str:
         before, content, after = m.group(1), m.group(2), m.group(3)
         content_s = str(content or "")
-        parsed = _META_REFRESH_CONTENT_RE.match(content_s)
-        if not parsed:
+        url = _meta_refresh_url(content_s)
+        if url is None:
             return m.group(0)
 
-        url = (parsed.group("url") or "").strip()
         url = url.strip("\"'")
         if url:
             new_content = f"{int(max_delay_s)}; url={url}"
@@ -49,49 +85,53 @@ def _speed_up_meta_refresh(html: str, *, max_delay_s: int = 0) -> str:
         return f"{before}{new_content}{after}"
 
     # Rewrite: content="10; url=..." -> content="0; url=..." (case-insensitive).
-    return re.sub(
-        r"(<meta\b[^>]*\bhttp-equiv\s*=\s*['\"]?refresh['\"]?[^>]*\bcontent\s*=\s*['\"])([^'\"]*)(['\"])",
-        _repl,
-        html,
-        flags=re.IGNORECASE,
-    )
+    return _META_REFRESH_TAG_RE.sub(_repl, html)
 
 
 def render_html_document(*, sanitized_html: str, payload_context: "PayloadContext") -> str:
-    if payload_context in ("http_leak", "http_leak_style"):
-        template = _template_for_http_leak_payload(sanitized_html)
-    else:
-        template = {
-            "html": _HTML_TEMPLATE,
-            "html_head": _HTML_HEAD_TEMPLATE,
-            "html_outer": _HTML_OUTER_TEMPLATE,
-            "href": _HREF_TEMPLATE,
-            "js": _JS_TEMPLATE,
-            "js_arg": _JS_ARG_TEMPLATE,
-            "js_string": _JS_STRING_TEMPLATE,
-            "js_string_double": _JS_STRING_DOUBLE_TEMPLATE,
-            "onerror_attr": _ONERROR_ATTR_TEMPLATE,
-        }.get(payload_context)
+    return _render_html_document_cached(sanitized_html, payload_context)
+
+
+# Rendering is a pure function of its inputs (templates and the prelude are
+# module constants), and each case is rendered more than once (for the report
+# and again by the harness), so memoize it. If templates ever become dynamic,
+# this cache must be keyed on them too.
+@lru_cache(maxsize=4096)
+def _render_html_document_cached(sanitized_html: str, payload_context: "PayloadContext") -> str:
+    template = _TEMPLATE_BY_CONTEXT.get(payload_context)
     if template is None:
         raise ValueError(f"Unknown payload_context: {payload_context!r}")
-
-    html = template.replace("__XSSBENCH_PAYLOAD__", sanitized_html)
-    html = html.replace("__XSSBENCH_PRELUDE__", _XSSBENCH_PRELUDE_HTML)
-    html = _speed_up_meta_refresh(html)
+    if not isinstance(template, str):
+        template = template(sanitized_html)
+
+    html = sanitized_html.join(_template_parts(template))
+    if "__XSSBENCH_PRELUDE__" in sanitized_html:
+        # Keep the historical behavior of the chained replace(): a prelude
+        # placeholder inside the payload was substituted as well.
+        html = html.replace("__XSSBENCH_PRELUDE__", _XSSBENCH_PRELUDE_HTML)
+    # The templates never contain a meta refresh, so only the payload can
+    # introduce one; skip scanning the whole document when it doesn't.
+    if _META_REFRESH_PRESENT_RE.search(sanitized_html):
+        html = _speed_up_meta_refresh(html)
     return html
 
 
+@lru_cache(maxsize=None)
+def _template_parts(template: str) -> tuple[str, ...]:
+    # Fill in the prelude and split on the payload placeholder once per
+    # template, so rendering is a single join() instead of a replace() pass
+    # per placeholder.
+    return tuple(template.replace("__XSSBENCH_PRELUDE__", _XSSBENCH_PRELUDE_HTML).split("__XSSBENCH_PAYLOAD__"))
+
+
+# - chrome-error://: Chromium shows this for aborted/blocked navigations.
+# - about:srcdoc: <iframe srcdoc> loads navigate here; that's not script execution.
+_IGNORABLE_NAVIGATION_PREFIXES = ("chrome-error://", "about:srcdoc")
+
+
 def _is_ignorable_navigation_url(url: str) -> bool:
-    # Chromium shows this for aborted/blocked navigations.
-    if url.startswith("chrome-error://"):
-        return True
-    # Can appear transiently during navigations.
-    if url == "about:blank":
-        return True
-    # <iframe srcdoc> loads navigate to about:srcdoc; that's not script execution.
-    if url.startswith("about:srcdoc"):
-        return True
-    return False
+    # about:blank can appear transiently during navigations.
+    return url == "about:blank" or url.startswith(_IGNORABLE_NAVIGATION_PREFIXES)
 
 
 def _filter_navigation_urls_for_execution(
@@ -101,28 +141,24 @@ def _filter_navigation_urls_for_execution(
     payload_context: "PayloadContext",
     expected_href_click_url: str | None,
 ) -> list[str]:
-    out: list[str] = []
-    for url in urls:
-        if not url:
-            continue
-        if _is_ignorable_navigation_url(url):
-            continue
-        # Ignore same-document hash navigations like `http://xssbench.local/#...`.
-        if url.startswith(base_url + "#"):
-            continue
+    # Ignore same-document hash navigations like `http://xssbench.local/#...`.
+    hash_prefix = base_url + "#"
+    # In href-context we intentionally click the link.
+    # A plain navigation to the link target is not XSS; it just means the URL was allowed.
+    click_url = expected_href_click_url if payload_context == "href" and expected_href_click_url else None
+    return [
+        url
+        for url in urls
+        if url and not _is_ignorable_navigation_url(url) and not url.startswith(hash_prefix) and url != click_url
+    ]
+
 
-        if payload_context == "href" and expected_href_click_url:
-            # In href-context we intentionally click the link.
-            # A plain navigation to the link target is not XSS; it just means the URL was allowed.
-            if url == expected_href_click_url:
-                continue
-        out.append(url)
-    return out
+_NAVIGATION_CONTEXT_DESTROYED_MARKERS = ("Execution context was destroyed", "most likely because of a navigation")
 
 
 def _looks_like_navigation_context_destroyed(exc: Exception) -> bool:
     msg = str(exc)
-    return "Execution context was destroyed" in msg or "most likely because of a navigation" in msg
+    return any(marker in msg for marker in _NAVIGATION_CONTEXT_DESTROYED_MARKERS)
 
 
 @dataclass(frozen=True, slots=True)
@@ -135,6 +171,26 @@ class VectorResult:
     signal: str = "none"
 
 
+# VectorResult is frozen, so the common "nothing happened" outcome can be shared.
+_NO_EXECUTION_RESULT = VectorResult(executed=False, details="No execution detected")
+
+
+def _navigation_result(exec_nav: list[str], *, payload_html: str, payload_context: "PayloadContext") -> VectorResult:
+    # Navigations are execution, except in http_leak contexts where a document
+    # load is the leak being measured.
+    urls = ", ".join(exec_nav[:3])
+    if _is_http_leak_context(payload_context):
+        return VectorResult(
+            executed=False,
+            details=f"External fetch: document:{urls}; payload={payload_html!r}",
+            signal="http_leak",
+        )
+    return VectorResult(
+        executed=True,
+        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
+    )
+
+
 BrowserName = Literal["chromium", "firefox", "webkit"]
 
 
@@ -153,22 +209,54 @@ PayloadContext = Literal[
 ]
 
 
+_HTTP_LEAK_CONTEXTS = frozenset({"http_leak", "http_leak_style"})
+
+_HTTP_SCHEMES = frozenset({"http", "https"})
+
+
+def _scheme_netloc(url: str) -> tuple[str, str]:
+    """Return `(scheme, netloc)` of a URL, like `urlsplit` but without parsing the rest.
+
+    Only meant for the canonical URLs Playwright reports for requests.
+    """
+
+    i = url.find(":")
+    if i <= 0:
+        return "", ""
+    scheme = url[:i].lower()
+    if not url.startswith("//", i + 1):
+        return scheme, ""
+    start = i + 3
+    end = len(url)
+    for ch in "/?#":
+        j = url.find(ch, start, end)
+        if j != -1:
+            end = j
+    return scheme, url[start:end]
+
+
 def _is_http_leak_context(payload_context: "PayloadContext") -> bool:
-    return payload_context in ("http_leak", "http_leak_style")
+    return payload_context in _HTTP_LEAK_CONTEXTS
+
+
+_LEADING_TAG_RE = re.compile(r"<\s*([A-Za-z][A-Za-z0-9:-]*)")
+
+# Leading tags that need the payload to replace the whole document structure.
+_HTTP_LEAK_OUTER_TAGS = frozenset({"html", "body", "frameset"})
 
 
 def _template_for_http_leak_payload(sanitized_html: str) -> str:
     # Heuristic placement for HTTP-leak primitives.
     # We keep the vector payloads raw but still want head-only tags like <meta>
     # and <link> to land in <head> when possible.
-    m = re.search(r"<\s*([A-Za-z][A-Za-z0-9:-]*)", sanitized_html)
+    m = _LEADING_TAG_RE.search(sanitized_html)
     tag = m.group(1).lower() if m else ""
 
     # For leak vectors, many primitives only fire when the tag ends up in the
     # right place (head vs body), and some engines are stricter than others.
     # To avoid per-vector special-casing, render most payloads in BOTH head and
     # body. The browser's parser will ignore/move invalid placements.
-    if tag in {"html", "body", "frameset"}:
+    if tag in _HTTP_LEAK_OUTER_TAGS:
         return _HTML_OUTER_TEMPLATE
     return _HTML_HEAD_AND_BODY_TEMPLATE
 
@@ -314,10 +402,28 @@ _ONERROR_ATTR_TEMPLATE = """<!doctype html>
 </html>
 """
 
+# Template per context; http_leak contexts map to a function that picks one per payload.
+_TEMPLATE_BY_CONTEXT: dict[str, str | Callable[[str], str]] = {
+    "http_leak": _template_for_http_leak_payload,
+    "http_leak_style": _template_for_http_leak_payload,
+    "html": _HTML_TEMPLATE,
+    "html_head": _HTML_HEAD_TEMPLATE,
+    "html_outer": _HTML_OUTER_TEMPLATE,
+    "href": _HREF_TEMPLATE,
+    "js": _JS_TEMPLATE,
+    "js_arg": _JS_ARG_TEMPLATE,
+    "js_string": _JS_STRING_TEMPLATE,
+    "js_string_double": _JS_STRING_DOUBLE_TEMPLATE,
+    "onerror_attr": _ONERROR_ATTR_TEMPLATE,
+}
 
-@lru_cache(maxsize=None)
+
+_JS_ASSETS_DIR = importlib.resources.files("xssbench").joinpath("js")
+
+
+# Only called at import time to build the module-level JS constants below.
 def _read_js_asset_text(name: str) -> str:
-    return importlib.resources.files("xssbench").joinpath("js").joinpath(name).read_text(encoding="utf-8")
+    return _JS_ASSETS_DIR.joinpath(name).read_text(encoding="utf-8")
 
 
 def _script_tag(js: str) -> str:
@@ -333,11 +439,68 @@ _XSSBENCH_PRELUDE_HTML = ""
 
 _TRIGGER_EVENTS_JS = _read_js_asset_text("trigger_events.js")
 
+# Resolved `href` for each element handle passed in (one round-trip for all anchors).
+_RESOLVED_HREFS_JS = "(els) => els.map((el) => String(el.href || ''))"
+
 _DETECT_JAVASCRIPT_URLS_JS = _read_js_asset_text("detect_javascript_urls.js")
 
+# The post-load checks (dangerous URLs, execution hook, href-context link target)
+# in a single round-trip. Each part fails independently, like the separate probes.
+_POST_LOAD_PROBE_JS = (
+    "() => {\n"
+    f"    const detect = {_DETECT_JAVASCRIPT_URLS_JS.strip().rstrip(';')};\n"
+    "    let jsUrls = [];\n"
+    "    try { jsUrls = detect(); } catch (e) {}\n"
+    "    let hook = '';\n"
+    "    try { hook = (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''; } catch (e) {}\n"
+    "    let linkHref = '';\n"
+    "    try { const a = document.getElementById('xssbench-link'); linkHref = a ? String(a.href || '') : ''; } catch (e) {}\n"
+    "    return { jsUrls, hook, linkHref };\n"
+    "}"
+)
+
+# Hook check after the synthetic events plus the resolved `href` of every link the
+# anchor pass would look at (open shadow roots included, like Playwright's CSS
+# engine), so that pass can be skipped when there is no `javascript:` link.
+# `hrefs` is null if the scan fails.
+_POST_TRIGGER_PROBE_JS = """() => {
+    let hook = '';
+    try { hook = (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''; } catch (e) {}
+    let hrefs = [];
+    try {
+        const visit = (root) => {
+            for (const el of root.querySelectorAll('*')) {
+                if (el.matches('a[href], area[href]')) hrefs.push(String(el.href || ''));
+                if (el.shadowRoot) visit(el.shadowRoot);
+            }
+        };
+        visit(document);
+    } catch (e) {
+        hrefs = null;
+    }
+    return { hook, hrefs };
+}"""
+
+
+def _str_result(value: Any) -> str:
+    # The probes above always return strings (String(...) on the JS side); anything
+    # else means the value is missing.
+    return value if isinstance(value, str) else ""
+
+
+def _has_javascript_href(hrefs: list[Any]) -> bool:
+    return any(str(x or "").strip().lower().startswith("javascript:") for x in hrefs)
+
+
 _EXTERNAL_REQUEST_GESTURES_JS = _read_js_asset_text("external_request_gestures.js")
 
 
+# Harnesses are created per worker / per run; resolve the Playwright API module once.
+@lru_cache(maxsize=None)
+def _playwright_api(name: str) -> Any:
+    return importlib.import_module(name)
+
+
 class BrowserHarness:
     def __init__(self, *, browser: BrowserName, headless: bool = True):
         self._browser_name = browser
@@ -352,12 +515,18 @@ class BrowserHarness:
         self._navigation_requests: list[str] = []
         self._dialog_events: list[str] = []
         self._base_navigation_count: int = 0
-        self._current_html: str = ""
+        # UTF-8 body of the current synthetic document, encoded once per run.
+        self._current_html: bytes = b""
         self._base_url: str = "http://xssbench.local/"
+        # Derived from `_base_url`; used on every routed request / navigation.
+        self._base_origin = _scheme_netloc(self._base_url)
+        self._base_hash_prefix = self._base_url + "#"
+        # Whether a vector has been loaded into `_page` yet.
+        self._page_has_vector = False
 
     def __enter__(self) -> "BrowserHarness":
         try:
-            sync_api = importlib.import_module("playwright.sync_api")
+            sync_api = _playwright_api("playwright.sync_api")
             sync_playwright = sync_api.sync_playwright
             self._timeout_error = sync_api.TimeoutError
         except Exception as exc:  # pragma: no cover
@@ -395,6 +564,7 @@ class BrowserHarness:
             ) from exc
 
         self._page = self._browser_instance.new_page()
+        self._page_has_vector = False
 
         # Ensure our execution hook is present in every frame/document.
         try:
@@ -414,106 +584,104 @@ class BrowserHarness:
         except Exception:
             pass
 
-        def _on_dialog(dialog) -> None:
-            try:
-                dialog_type = getattr(dialog, "type", "")
-                dialog_message = getattr(dialog, "message", "")
-                details = f"dialog:{dialog_type}:{dialog_message}"
-            except Exception:
-                details = "dialog"
+        self._page.on("dialog", self._handle_dialog)
 
-            self._dialog_events.append(details)
+        self._page.on("framenavigated", self._handle_frame_navigated)
 
-            # Always handle dialogs to avoid deadlocks.
-            try:
-                if dialog_type == "prompt":
-                    default_value = ""
-                    try:
-                        default_value = str(getattr(dialog, "default_value", "") or "")
-                    except Exception:
-                        default_value = ""
-                    dialog.accept(default_value)
-                else:
-                    dialog.accept()
-            except Exception:
-                try:
-                    dialog.dismiss()
-                except Exception:
-                    pass
+        self._page.route("**/*", self._handle_route)
 
-        self._page.on("dialog", _on_dialog)
+        return self
 
-        def _on_frame_navigated(frame) -> None:
+    def _handle_dialog(self, dialog) -> None:
+        try:
+            dialog_type = getattr(dialog, "type", "")
+            dialog_message = getattr(dialog, "message", "")
+            details = f"dialog:{dialog_type}:{dialog_message}"
+        except Exception:
+            details = "dialog"
+
+        self._dialog_events.append(details)
+
+        # Always handle dialogs to avoid deadlocks.
+        try:
+            if dialog_type == "prompt":
+                default_value = ""
+                try:
+                    default_value = str(getattr(dialog, "default_value", "") or "")
+                except Exception:
+                    default_value = ""
+                dialog.accept(default_value)
+            else:
+                dialog.accept()
+        except Exception:
             try:
-                url = frame.url
+                dialog.dismiss()
             except Exception:
-                return
-            if not url:
-                return
-
-            # Ignore same-document hash navigations like `http://xssbench.local/#...`.
-            # These are often benign side-effects of anchor interactions and are
-            # not a reliable XSS execution signal.
-            if url.startswith(self._base_url + "#"):
-                return
-
-            if url == self._base_url:
-                # Initial navigation to the synthetic document is expected.
-                # If we see subsequent navigations back to the same URL, that's
-                # likely a META refresh / reload induced by the payload.
-                self._base_navigation_count += 1
-                if self._base_navigation_count > 1:
-                    self._navigation_requests.append(url)
-                return
-
-            self._navigation_requests.append(url)
-
-        self._page.on("framenavigated", _on_frame_navigated)
-
-        def _route(route) -> None:
-            req = route.request
-            base = urlsplit(self._base_url)
-            req_parts = urlsplit(req.url)
-            is_http = req_parts.scheme in {"http", "https"}
-            is_same_origin = (
-                is_http
-                and bool(req_parts.netloc)
-                and req_parts.scheme == base.scheme
-                and req_parts.netloc == base.netloc
-            )
-            # Serve our synthetic document at a stable URL so scheme-relative URLs (//...) resolve.
-            if req.resource_type == "document" and req.url == self._base_url:
-                route.fulfill(status=200, content_type="text/html", body=self._current_html)
-                return
-
-            # If the payload causes a navigation (e.g. META refresh), treat that as execution.
-            # We still keep the run deterministic by aborting the navigation request.
-            if req.resource_type == "document":
-                self._navigation_requests.append(req.url)
+                pass
 
-            # Deterministic by default: block all network.
-            # If a payload attempts to fetch an external script, treat it as execution.
-            if req.resource_type == "script" and req.url.startswith(("http://", "https://")):
-                self._external_script_requests.append(req.url)
+    def _handle_frame_navigated(self, frame) -> None:
+        try:
+            url = frame.url
+        except Exception:
+            return
+        if not url:
+            return
 
-            # Record other external http(s) request attempts (images, stylesheets, XHR/fetch, fonts, etc).
-            # This is useful as a strong "risk" signal even when it isn't immediate JS execution.
+        # Ignore same-document hash navigations like `http://xssbench.local/#...`.
+        # These are often benign side-effects of anchor interactions and are
+        # not a reliable XSS execution signal.
+        if url.startswith(self._base_hash_prefix):
+            return
+
+        if url == self._base_url:
+            # Initial navigation to the synthetic document is expected.
+            # If we see subsequent navigations back to the same URL, that's
+            # likely a META refresh / reload induced by the payload.
+            self._base_navigation_count += 1
+            if self._base_navigation_count > 1:
+                self._navigation_requests.append(url)
+            return
+
+        self._navigation_requests.append(url)
+
+    def _handle_route(self, route) -> None:
+        req = route.request
+        req_url = req.url
+        rtype = req.resource_type
+        # Serve our synthetic document at a stable URL so scheme-relative URLs (//...) resolve.
+        if rtype == "document" and req_url == self._base_url:
+            route.fulfill(status=200, content_type="text/html", body=self._current_html)
+            return
+
+        # If the payload causes a navigation (e.g. META refresh), treat that as execution.
+        # We still keep the run deterministic by aborting the navigation request.
+        if rtype == "document":
+            # Drop URLs the execution filter would always ignore, so it has less to rescan.
             if (
-                req.resource_type not in {"document", "script"}
-                and req.url.startswith(("http://", "https://"))
-                and not is_same_origin
+                req_url
+                and not req_url.startswith(self._base_hash_prefix)
+                and not _is_ignorable_navigation_url(req_url)
             ):
-                try:
-                    rtype = str(getattr(req, "resource_type", "") or "")
-                except Exception:
-                    rtype = ""
-                self._external_network_requests.append((rtype, req.url))
+                self._navigation_requests.append(req_url)
+            route.abort()
+            return
 
+        # Deterministic by default: block all network. Only http(s) requests are
+        # recorded, so anything else (data:, blob:, ...) is aborted right away.
+        req_origin = _scheme_netloc(req_url)
+        if req_origin[0] not in _HTTP_SCHEMES:
             route.abort()
+            return
 
-        self._page.route("**/*", _route)
+        if rtype == "script":
+            # If a payload attempts to fetch an external script, treat it as execution.
+            self._external_script_requests.append(req_url)
+        elif not req_origin[1] or req_origin != self._base_origin:
+            # Record other external http(s) request attempts (images, stylesheets, XHR/fetch, fonts, etc).
+            # This is useful as a strong "risk" signal even when it isn't immediate JS execution.
+            self._external_network_requests.append((str(rtype or ""), req_url))
 
-        return self
+        route.abort()
 
     def __exit__(self, exc_type, exc, tb) -> None:
         try:
@@ -523,6 +691,28 @@ class BrowserHarness:
             if self._pw_cm is not None:
                 self._pw_cm.__exit__(exc_type, exc, tb)
 
+    def _reset_state(self) -> None:
+        self._external_script_requests.clear()
+        self._external_network_requests.clear()
+        self._navigation_requests.clear()
+        self._dialog_events.clear()
+        self._base_navigation_count = 0
+
+    def _hook_details(self) -> str:
+        # Only check the main page; child frames can hang if they're navigating
+        # or in a problematic state.
+        try:
+            details = _str_result(
+                self._page.evaluate(
+                    "() => (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''"
+                )
+            )
+            if details:
+                return details
+        except Exception:
+            pass
+        return ""
+
     def run(
         self,
         *,
@@ -540,31 +730,43 @@ class BrowserHarness:
         # vector run.
         #
         # Only clean up the main page; child frames can hang if they're navigating
-        # or in a problematic state.
-        try:
-            self._page.evaluate(
-                "() => { try { window.__xssbench && window.__xssbench.cleanup && window.__xssbench.cleanup(); } catch (e) {} }"
-            )
-        except Exception:
-            pass
+        # or in a problematic state. Nothing to clean up before the first vector.
+        if self._page_has_vector:
+            try:
+                self._page.evaluate(
+                    "() => { try { window.__xssbench && window.__xssbench.cleanup && window.__xssbench.cleanup(); } catch (e) {} }"
+                )
+            except Exception:
+                pass
+        self._page_has_vector = True
 
-        self._external_script_requests.clear()
-        self._external_network_requests.clear()
-        self._navigation_requests.clear()
-        self._dialog_events.clear()
-        self._base_navigation_count = 0
+        self._reset_state()
 
         expected_href_click_url: str | None = None
 
+        # (len(_navigation_requests), expected_href_click_url, filtered urls)
+        nav_memo: tuple[int, str | None, list[str]] | None = None
+
         def _execution_navigation_urls() -> list[str]:
-            return _filter_navigation_urls_for_execution(
+            # Called on every poll iteration. During a run `_navigation_requests`
+            # only grows (the post-goto discard resets the memo), so its length
+            # identifies its contents.
+            nonlocal nav_memo
+            n = len(self._navigation_requests)
+            if nav_memo is not None and nav_memo[0] == n and nav_memo[1] == expected_href_click_url:
+                return nav_memo[2]
+            urls = _filter_navigation_urls_for_execution(
                 self._navigation_requests,
                 base_url=self._base_url,
                 payload_context=payload_context,
                 expected_href_click_url=expected_href_click_url,
             )
+            nav_memo = (n, expected_href_click_url, urls)
+            return urls
 
-        self._current_html = render_html_document(sanitized_html=sanitized_html, payload_context=payload_context)
+        self._current_html = render_html_document(
+            sanitized_html=sanitized_html, payload_context=payload_context
+        ).encode("utf-8")
         # In WebKit, vectors that synchronously trigger a navigation (e.g. via `location = ...`)
         # can prevent the `load` event from ever settling, causing `goto(..., wait_until="load")`
         # to hang until Playwright's default 30s timeout.
@@ -582,17 +784,7 @@ class BrowserHarness:
             if self._timeout_error is not None and isinstance(exc, self._timeout_error):
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
                 if self._external_script_requests:
                     urls = ", ".join(self._external_script_requests[:3])
                     return VectorResult(
@@ -632,36 +824,33 @@ class BrowserHarness:
         # We only discard navigations to the base URL here; navigations to other
         # URLs are still meaningful execution signals.
         try:
-            if self._navigation_requests:
-                self._navigation_requests[:] = [u for u in self._navigation_requests if u != self._base_url]
+            nav = self._navigation_requests
+            base_url = self._base_url
+            if base_url in nav:
+                nav[:] = [u for u in nav if u != base_url]
+                nav_memo = None
             if self._base_navigation_count < 1:
                 self._base_navigation_count = 1
         except Exception:
             pass
 
-        def _hook_details() -> str:
-            # Only check the main page; child frames can hang if they're navigating
-            # or in a problematic state.
-            try:
-                details = str(
-                    self._page.evaluate(
-                        "() => (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''"
-                    )
-                    or ""
-                )
-                if details:
-                    return details
-            except Exception:
-                pass
-            return ""
+        # One round-trip for the post-load checks below; if it fails, fall back to
+        # the individual probes.
+        try:
+            probe: dict[str, Any] | None = self._page.evaluate(_POST_LOAD_PROBE_JS) or {}
+        except Exception:
+            probe = None
 
         # Deterministic signal: if the DOM contains any `javascript:` URL attributes,
         # treat that as execution/risk even if a particular engine doesn't reliably
         # execute it for that element type.
-        try:
-            js_urls = self._page.evaluate(_DETECT_JAVASCRIPT_URLS_JS)
-        except Exception:
-            js_urls = []
+        if probe is not None:
+            js_urls = probe.get("jsUrls") or []
+        else:
+            try:
+                js_urls = self._page.evaluate(_DETECT_JAVASCRIPT_URLS_JS)
+            except Exception:
+                js_urls = []
 
         if js_urls:
             first = js_urls[0]
@@ -673,7 +862,7 @@ class BrowserHarness:
                 ),
             )
 
-        hook = _hook_details()
+        hook = _str_result(probe.get("hook")) if probe is not None else self._hook_details()
         if hook:
             return VectorResult(
                 executed=True,
@@ -692,17 +881,19 @@ class BrowserHarness:
         # deferred resource loads). We'll check again after the wait.
 
         if payload_context == "href":
-            try:
-                # Use the resolved absolute link target so relative values match what the
-                # browser will navigate to.
-                expected_href_click_url = str(
-                    self._page.evaluate(
-                        "() => { const a = document.getElementById('xssbench-link'); return a ? String(a.href || '') : ''; }"
+            # Use the resolved absolute link target so relative values match what the
+            # browser will navigate to.
+            if probe is not None:
+                expected_href_click_url = _str_result(probe.get("linkHref"))
+            else:
+                try:
+                    expected_href_click_url = _str_result(
+                        self._page.evaluate(
+                            "() => { const a = document.getElementById('xssbench-link'); return a ? String(a.href || '') : ''; }"
+                        )
                     )
-                    or ""
-                )
-            except Exception:
-                expected_href_click_url = None
+                except Exception:
+                    expected_href_click_url = None
 
             # `javascript:` URIs often require a real click gesture.
             try:
@@ -710,7 +901,7 @@ class BrowserHarness:
             except Exception:
                 pass
 
-            hook = _hook_details()
+            hook = self._hook_details()
             if hook:
                 return VectorResult(
                     executed=True,
@@ -722,17 +913,7 @@ class BrowserHarness:
             except Exception as exc:
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
                 if _looks_like_navigation_context_destroyed(exc):
                     return VectorResult(
                         executed=True,
@@ -740,24 +921,45 @@ class BrowserHarness:
                     )
                 raise exc
 
-            hook = _hook_details()
+            try:
+                post_trigger: dict[str, Any] | None = self._page.evaluate(_POST_TRIGGER_PROBE_JS) or {}
+            except Exception:
+                post_trigger = None
+
+            hook = _str_result(post_trigger.get("hook")) if post_trigger is not None else self._hook_details()
             if hook:
                 return VectorResult(
                     executed=True,
                     details=f"Executed: hook:{hook}; payload={payload_html!r}",
                 )
 
+            scanned_hrefs = post_trigger.get("hrefs") if post_trigger is not None else None
+
             # Ensure `javascript:`-ish links are clicked with a trusted gesture.
             try:
-                anchors = self._page.query_selector_all("a[href], area[href]")
-                for h in anchors:
+                anchors = (
+                    self._page.query_selector_all("a[href], area[href]")
+                    if scanned_hrefs is None or _has_javascript_href(scanned_hrefs)
+                    else []
+                )
+                # Resolve every `href` in one round-trip instead of one per anchor.
+                try:
+                    hrefs: list[str] | None = (
+                        [_str_result(x) for x in self._page.evaluate(_RESOLVED_HREFS_JS, anchors)] if anchors else []
+                    )
+                except Exception:
+                    hrefs = None
+                for i, h in enumerate(anchors):
                     try:
                         # Use resolved `href` so we match what the browser will actually execute.
                         resolved_href = ""
-                        try:
-                            resolved_href = str(self._page.evaluate("(el) => String(el.href || '')", h) or "")
-                        except Exception:
-                            resolved_href = h.get_attribute("href") or ""
+                        if hrefs is not None:
+                            resolved_href = hrefs[i]
+                        else:
+                            try:
+                                resolved_href = _str_result(self._page.evaluate("(el) => String(el.href || '')", h))
+                            except Exception:
+                                resolved_href = h.get_attribute("href") or ""
                         normalized = resolved_href.strip().lower()
                         if normalized.startswith("javascript:"):
                             h.click(timeout=timeout_ms, force=True)
@@ -776,17 +978,7 @@ class BrowserHarness:
         # If we observed any document navigation attempt at any point, treat it as execution.
         exec_nav = _execution_navigation_urls()
         if exec_nav:
-            urls = ", ".join(exec_nav[:3])
-            if _is_http_leak_context(payload_context):
-                return VectorResult(
-                    executed=False,
-                    details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                    signal="http_leak",
-                )
-            return VectorResult(
-                executed=True,
-                details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-            )
+            return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
         # Fast path: most synchronous payloads will have already tripped the hook
         # (or a navigation/external-script signal). Only wait when asked.
@@ -803,7 +995,9 @@ class BrowserHarness:
 
         if timeout_ms > 0:
             deadline_s = time.monotonic() + (timeout_ms / 1000.0)
-            poll_ms = 50
+            # Start polling fast so payloads that fire right away are caught early,
+            # then back off to the usual 50ms.
+            poll_ms = 2
             while True:
                 if self._external_script_requests:
                     urls = ", ".join(self._external_script_requests[:3])
@@ -814,19 +1008,9 @@ class BrowserHarness:
 
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
-                hook = _hook_details()
+                hook = self._hook_details()
                 if hook:
                     return VectorResult(
                         executed=True,
@@ -867,6 +1051,7 @@ class BrowserHarness:
                             details=f"Executed: navigation:context-destroyed; payload={payload_html!r}",
                         )
                     raise
+                poll_ms = min(poll_ms * 2, 50)
 
         # Re-check delayed signals after waiting.
         if self._external_script_requests:
@@ -878,19 +1063,9 @@ class BrowserHarness:
 
         exec_nav = _execution_navigation_urls()
         if exec_nav:
-            urls = ", ".join(exec_nav[:3])
-            if _is_http_leak_context(payload_context):
-                return VectorResult(
-                    executed=False,
-                    details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                    signal="http_leak",
-                )
-            return VectorResult(
-                executed=True,
-                details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-            )
+            return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
-        hook = _hook_details()
+        hook = self._hook_details()
         if hook:
             return VectorResult(
                 executed=True,
@@ -912,7 +1087,7 @@ class BrowserHarness:
                 signal="http_leak",
             )
 
-        return VectorResult(executed=False, details="No execution detected")
+        return _NO_EXECUTION_RESULT
 
 
 class AsyncBrowserHarness:
@@ -929,12 +1104,21 @@ class AsyncBrowserHarness:
         self._navigation_requests: list[str] = []
         self._dialog_events: list[str] = []
         self._base_navigation_count: int = 0
-        self._current_html: str = ""
+        # UTF-8 body of the current synthetic document, encoded once per run.
+        self._current_html: bytes = b""
         self._base_url: str = "http://xssbench.local/"
+        # Derived from `_base_url`; used on every routed request / navigation.
+        self._base_origin = _scheme_netloc(self._base_url)
+        self._base_hash_prefix = self._base_url + "#"
+        # Whether a vector has been loaded into `_page` yet.
+        self._page_has_vector = False
+        # Set whenever a dialog, navigation or request signal is recorded, so the
+        # post-load wait loop wakes up right away instead of at its next poll.
+        self._signal_event = asyncio.Event()
 
     async def __aenter__(self) -> "AsyncBrowserHarness":
         try:
-            async_api = importlib.import_module("playwright.async_api")
+            async_api = _playwright_api("playwright.async_api")
             async_playwright = async_api.async_playwright
             self._timeout_error = async_api.TimeoutError
         except Exception as exc:  # pragma: no cover
@@ -972,6 +1156,14 @@ class AsyncBrowserHarness:
             ) from exc
 
         self._page = await self._browser_instance.new_page()
+        await self._setup_page()
+
+        return self
+
+    async def _setup_page(self) -> None:
+        """Install the prelude, timeouts, listeners and routing on `self._page`."""
+
+        self._page_has_vector = False
 
         # Ensure our execution hook is present in every frame/document.
         try:
@@ -988,101 +1180,100 @@ class AsyncBrowserHarness:
         except Exception:
             pass
 
-        import asyncio
+        self._page.on("dialog", self._handle_dialog)
 
-        def _on_dialog(dialog) -> None:
-            try:
-                dialog_type = getattr(dialog, "type", "")
-                dialog_message = getattr(dialog, "message", "")
-                details = f"dialog:{dialog_type}:{dialog_message}"
-            except Exception:
-                details = "dialog"
-
-            self._dialog_events.append(details)
+        self._page.on("framenavigated", self._handle_frame_navigated)
 
-            async def _handle() -> None:
-                try:
-                    if dialog_type == "prompt":
-                        default_value = ""
-                        try:
-                            default_value = str(getattr(dialog, "default_value", "") or "")
-                        except Exception:
-                            default_value = ""
-                        await dialog.accept(default_value)
-                    else:
-                        await dialog.accept()
-                except Exception:
-                    try:
-                        await dialog.dismiss()
-                    except Exception:
-                        pass
+        await self._page.route("**/*", self._handle_route)
 
-            try:
-                asyncio.get_running_loop().create_task(_handle())
-            except Exception:
-                # If we can't schedule it, best effort: do nothing.
-                pass
+    def _handle_dialog(self, dialog) -> None:
+        try:
+            dialog_type = getattr(dialog, "type", "")
+            dialog_message = getattr(dialog, "message", "")
+            details = f"dialog:{dialog_type}:{dialog_message}"
+        except Exception:
+            details = "dialog"
 
-        self._page.on("dialog", _on_dialog)
+        self._dialog_events.append(details)
+        self._signal_event.set()
 
-        def _on_frame_navigated(frame) -> None:
+        async def _handle() -> None:
             try:
-                url = frame.url
+                if dialog_type == "prompt":
+                    default_value = ""
+                    try:
+                        default_value = str(getattr(dialog, "default_value", "") or "")
+                    except Exception:
+                        default_value = ""
+                    await dialog.accept(default_value)
+                else:
+                    await dialog.accept()
             except Exception:
-                return
-            if not url:
-                return
-
-            if url.startswith(self._base_url + "#"):
-                return
-
-            if url == self._base_url:
-                self._base_navigation_count += 1
-                if self._base_navigation_count > 1:
-                    self._navigation_requests.append(url)
-                return
-
-            self._navigation_requests.append(url)
-
-        self._page.on("framenavigated", _on_frame_navigated)
-
-        async def _route(route) -> None:
-            req = route.request
-            base = urlsplit(self._base_url)
-            req_parts = urlsplit(req.url)
-            is_http = req_parts.scheme in {"http", "https"}
-            is_same_origin = (
-                is_http
-                and bool(req_parts.netloc)
-                and req_parts.scheme == base.scheme
-                and req_parts.netloc == base.netloc
-            )
-            if req.resource_type == "document" and req.url == self._base_url:
-                await route.fulfill(status=200, content_type="text/html", body=self._current_html)
-                return
-
-            if req.resource_type == "document":
-                self._navigation_requests.append(req.url)
+                try:
+                    await dialog.dismiss()
+                except Exception:
+                    pass
 
-            if req.resource_type == "script" and req.url.startswith(("http://", "https://")):
-                self._external_script_requests.append(req.url)
+        try:
+            asyncio.get_running_loop().create_task(_handle())
+        except Exception:
+            # If we can't schedule it, best effort: do nothing.
+            pass
 
+    def _handle_frame_navigated(self, frame) -> None:
+        try:
+            url = frame.url
+        except Exception:
+            return
+        if not url:
+            return
+
+        if url.startswith(self._base_hash_prefix):
+            return
+
+        if url == self._base_url:
+            self._base_navigation_count += 1
+            if self._base_navigation_count > 1:
+                self._navigation_requests.append(url)
+                self._signal_event.set()
+            return
+
+        self._navigation_requests.append(url)
+        self._signal_event.set()
+
+    async def _handle_route(self, route) -> None:
+        req = route.request
+        req_url = req.url
+        rtype = req.resource_type
+        if rtype == "document" and req_url == self._base_url:
+            await route.fulfill(status=200, content_type="text/html", body=self._current_html)
+            return
+
+        if rtype == "document":
+            # Drop URLs the execution filter would always ignore, so it has less to rescan.
             if (
-                req.resource_type not in {"document", "script"}
-                and req.url.startswith(("http://", "https://"))
-                and not is_same_origin
+                req_url
+                and not req_url.startswith(self._base_hash_prefix)
+                and not _is_ignorable_navigation_url(req_url)
             ):
-                try:
-                    rtype = str(getattr(req, "resource_type", "") or "")
-                except Exception:
-                    rtype = ""
-                self._external_network_requests.append((rtype, req.url))
+                self._navigation_requests.append(req_url)
+                self._signal_event.set()
+            await route.abort()
+            return
 
+        req_origin = _scheme_netloc(req_url)
+        if req_origin[0] not in _HTTP_SCHEMES:
             await route.abort()
+            return
 
-        await self._page.route("**/*", _route)
+        if rtype == "script":
+            self._external_script_requests.append(req_url)
+            self._signal_event.set()
+        elif not req_origin[1] or req_origin != self._base_origin:
+            self._external_network_requests.append((str(rtype or ""), req_url))
+            self._signal_event.set()
 
-        return self
+        await route.abort()
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
         try:
@@ -1092,6 +1283,28 @@ class AsyncBrowserHarness:
             if self._pw_cm is not None:
                 await self._pw_cm.__aexit__(exc_type, exc, tb)
 
+    def _reset_state(self) -> None:
+        self._external_script_requests.clear()
+        self._external_network_requests.clear()
+        self._navigation_requests.clear()
+        self._dialog_events.clear()
+        self._base_navigation_count = 0
+
+    async def _hook_details(self) -> str:
+        # Only check the main page; child frames can hang if they're navigating
+        # or in a problematic state.
+        try:
+            details = _str_result(
+                await self._page.evaluate(
+                    "() => (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''"
+                )
+            )
+            if details:
+                return details
+        except Exception:
+            pass
+        return ""
+
     async def run(
         self,
         *,
@@ -1109,34 +1322,45 @@ class AsyncBrowserHarness:
         # vector run.
         #
         # Only clean up the main page; child frames can hang if they're navigating
-        # or in a problematic state.
-        try:
-            await self._page.evaluate(
-                "() => { try { window.__xssbench && window.__xssbench.cleanup && window.__xssbench.cleanup(); } catch (e) {} }"
-            )
-        except Exception:
-            pass
+        # or in a problematic state. Nothing to clean up before the first vector.
+        if self._page_has_vector:
+            try:
+                await self._page.evaluate(
+                    "() => { try { window.__xssbench && window.__xssbench.cleanup && window.__xssbench.cleanup(); } catch (e) {} }"
+                )
+            except Exception:
+                pass
+        self._page_has_vector = True
 
-        self._external_script_requests.clear()
-        self._external_network_requests.clear()
-        self._navigation_requests.clear()
-        self._dialog_events.clear()
-        self._base_navigation_count = 0
+        self._reset_state()
 
         first_external_network: tuple[str, str] | None = None
 
         expected_href_click_url: str | None = None
 
+        # (len(_navigation_requests), expected_href_click_url, filtered urls)
+        nav_memo: tuple[int, str | None, list[str]] | None = None
+
         def _execution_navigation_urls() -> list[str]:
-            return _filter_navigation_urls_for_execution(
+            # Called on every poll iteration. During a run `_navigation_requests`
+            # only grows (the post-goto discard resets the memo), so its length
+            # identifies its contents.
+            nonlocal nav_memo
+            n = len(self._navigation_requests)
+            if nav_memo is not None and nav_memo[0] == n and nav_memo[1] == expected_href_click_url:
+                return nav_memo[2]
+            urls = _filter_navigation_urls_for_execution(
                 self._navigation_requests,
                 base_url=self._base_url,
                 payload_context=payload_context,
                 expected_href_click_url=expected_href_click_url,
             )
+            nav_memo = (n, expected_href_click_url, urls)
+            return urls
 
-        html = render_html_document(sanitized_html=sanitized_html, payload_context=payload_context)
-        self._current_html = html
+        self._current_html = render_html_document(
+            sanitized_html=sanitized_html, payload_context=payload_context
+        ).encode("utf-8")
 
         try:
             await self._page.goto(
@@ -1148,17 +1372,7 @@ class AsyncBrowserHarness:
             if self._timeout_error is not None and isinstance(exc, self._timeout_error):
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
                 if self._external_script_requests:
                     urls = ", ".join(self._external_script_requests[:3])
                     return VectorResult(
@@ -1192,35 +1406,28 @@ class AsyncBrowserHarness:
 
         # See sync harness `run()` for rationale.
         try:
-            if self._navigation_requests:
-                self._navigation_requests[:] = [u for u in self._navigation_requests if u != self._base_url]
+            nav = self._navigation_requests
+            base_url = self._base_url
+            if base_url in nav:
+                nav[:] = [u for u in nav if u != base_url]
+                nav_memo = None
             if self._base_navigation_count < 1:
                 self._base_navigation_count = 1
         except Exception:
             pass
 
-        async def _hook_details() -> str:
-            # Only check the main page; child frames can hang if they're navigating
-            # or in a problematic state.
-            try:
-                details = str(
-                    (
-                        await self._page.evaluate(
-                            "() => (window.__xssbench && window.__xssbench.executed) ? String(window.__xssbench.details || '') : ''"
-                        )
-                    )
-                    or ""
-                )
-                if details:
-                    return details
-            except Exception:
-                pass
-            return ""
-
         try:
-            js_urls = await self._page.evaluate(_DETECT_JAVASCRIPT_URLS_JS)
+            probe: dict[str, Any] | None = (await self._page.evaluate(_POST_LOAD_PROBE_JS)) or {}
         except Exception:
-            js_urls = []
+            probe = None
+
+        if probe is not None:
+            js_urls = probe.get("jsUrls") or []
+        else:
+            try:
+                js_urls = await self._page.evaluate(_DETECT_JAVASCRIPT_URLS_JS)
+            except Exception:
+                js_urls = []
 
         if js_urls:
             first = js_urls[0]
@@ -1232,7 +1439,7 @@ class AsyncBrowserHarness:
                 ),
             )
 
-        hook = await _hook_details()
+        hook = _str_result(probe.get("hook")) if probe is not None else await self._hook_details()
         if hook:
             return VectorResult(
                 executed=True,
@@ -1248,17 +1455,7 @@ class AsyncBrowserHarness:
 
         exec_nav = _execution_navigation_urls()
         if exec_nav:
-            urls = ", ".join(exec_nav[:3])
-            if _is_http_leak_context(payload_context):
-                return VectorResult(
-                    executed=False,
-                    details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                    signal="http_leak",
-                )
-            return VectorResult(
-                executed=True,
-                details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-            )
+            return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
         if self._external_script_requests:
             urls = ", ".join(self._external_script_requests[:3])
@@ -1272,24 +1469,24 @@ class AsyncBrowserHarness:
         # deferred resource loads). We'll check again after the wait.
 
         if payload_context == "href":
-            try:
-                expected_href_click_url = str(
-                    (
+            if probe is not None:
+                expected_href_click_url = _str_result(probe.get("linkHref"))
+            else:
+                try:
+                    expected_href_click_url = _str_result(
                         await self._page.evaluate(
                             "() => { const a = document.getElementById('xssbench-link'); return a ? String(a.href || '') : ''; }"
                         )
                     )
-                    or ""
-                )
-            except Exception:
-                expected_href_click_url = None
+                except Exception:
+                    expected_href_click_url = None
 
             try:
                 await self._page.click("#xssbench-link", no_wait_after=True, timeout=timeout_ms)
             except Exception:
                 pass
 
-            hook = await _hook_details()
+            hook = await self._hook_details()
             if hook:
                 return VectorResult(
                     executed=True,
@@ -1301,17 +1498,7 @@ class AsyncBrowserHarness:
             except Exception as exc:
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
                 if _looks_like_navigation_context_destroyed(exc):
                     return VectorResult(
                         executed=True,
@@ -1319,22 +1506,46 @@ class AsyncBrowserHarness:
                     )
                 raise exc
 
-            hook = await _hook_details()
+            try:
+                post_trigger: dict[str, Any] | None = (await self._page.evaluate(_POST_TRIGGER_PROBE_JS)) or {}
+            except Exception:
+                post_trigger = None
+
+            hook = _str_result(post_trigger.get("hook")) if post_trigger is not None else await self._hook_details()
             if hook:
                 return VectorResult(
                     executed=True,
                     details=f"Executed: hook:{hook}; payload={payload_html!r}",
                 )
 
+            scanned_hrefs = post_trigger.get("hrefs") if post_trigger is not None else None
+
             try:
-                anchors = await self._page.query_selector_all("a[href], area[href]")
-                for h in anchors:
+                anchors = (
+                    await self._page.query_selector_all("a[href], area[href]")
+                    if scanned_hrefs is None or _has_javascript_href(scanned_hrefs)
+                    else []
+                )
+                try:
+                    hrefs: list[str] | None = (
+                        [_str_result(x) for x in await self._page.evaluate(_RESOLVED_HREFS_JS, anchors)]
+                        if anchors
+                        else []
+                    )
+                except Exception:
+                    hrefs = None
+                for i, h in enumerate(anchors):
                     try:
                         resolved_href = ""
-                        try:
-                            resolved_href = str((await self._page.evaluate("(el) => String(el.href || '')", h)) or "")
-                        except Exception:
-                            resolved_href = (await h.get_attribute("href")) or ""
+                        if hrefs is not None:
+                            resolved_href = hrefs[i]
+                        else:
+                            try:
+                                resolved_href = _str_result(
+                                    await self._page.evaluate("(el) => String(el.href || '')", h)
+                                )
+                            except Exception:
+                                resolved_href = (await h.get_attribute("href")) or ""
                         normalized = resolved_href.strip().lower()
                         if normalized.startswith("javascript:"):
                             await h.click(timeout=timeout_ms, force=True)
@@ -1351,17 +1562,7 @@ class AsyncBrowserHarness:
 
         exec_nav = _execution_navigation_urls()
         if exec_nav:
-            urls = ", ".join(exec_nav[:3])
-            if _is_http_leak_context(payload_context):
-                return VectorResult(
-                    executed=False,
-                    details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                    signal="http_leak",
-                )
-            return VectorResult(
-                executed=True,
-                details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-            )
+            return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
         if _is_http_leak_context(payload_context) and self._external_network_requests:
             rtype, url = self._external_network_requests[0]
@@ -1373,8 +1574,11 @@ class AsyncBrowserHarness:
 
         if timeout_ms > 0:
             deadline_s = time.monotonic() + (timeout_ms / 1000.0)
-            poll_ms = 50
+            # Start polling fast so payloads that fire right away are caught early,
+            # then back off to the usual 50ms.
+            poll_ms = 2
             while True:
+                self._signal_event.clear()
                 if self._external_script_requests:
                     urls = ", ".join(self._external_script_requests[:3])
                     return VectorResult(
@@ -1384,19 +1588,9 @@ class AsyncBrowserHarness:
 
                 exec_nav = _execution_navigation_urls()
                 if exec_nav:
-                    urls = ", ".join(exec_nav[:3])
-                    if _is_http_leak_context(payload_context):
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: document:{urls}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    return VectorResult(
-                        executed=True,
-                        details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                    )
+                    return _navigation_result(exec_nav, payload_html=payload_html, payload_context=payload_context)
 
-                hook = await _hook_details()
+                hook = await self._hook_details()
                 if hook:
                     return VectorResult(
                         executed=True,
@@ -1421,35 +1615,13 @@ class AsyncBrowserHarness:
                 remaining_ms = int((deadline_s - time.monotonic()) * 1000)
                 if remaining_ms <= 0:
                     break
+                # The hook has no Playwright event, so keep polling for it; every
+                # other signal wakes the loop through `_signal_event`.
                 try:
-                    await self._page.wait_for_timeout(min(poll_ms, remaining_ms))
-                except Exception as exc:
-                    exec_nav = _execution_navigation_urls()
-                    if exec_nav:
-                        urls = ", ".join(exec_nav[:3])
-                        return VectorResult(
-                            executed=True,
-                            details=f"Executed: navigation:{urls}; payload={payload_html!r}",
-                        )
-                    if self._external_script_requests:
-                        urls = ", ".join(self._external_script_requests[:3])
-                        return VectorResult(
-                            executed=True,
-                            details=f"Executed: external-script:{urls}; payload={payload_html!r}",
-                        )
-                    if _is_http_leak_context(payload_context) and self._external_network_requests:
-                        rtype, url = self._external_network_requests[0]
-                        return VectorResult(
-                            executed=False,
-                            details=f"External fetch: {rtype}:{url}; payload={payload_html!r}",
-                            signal="http_leak",
-                        )
-                    if _looks_like_navigation_context_destroyed(exc):
-                        return VectorResult(
-                            executed=True,
-                            details=f"Executed: navigation:context-destroyed; payload={payload_html!r}",
-                        )
-                    raise
+                    await asyncio.wait_for(self._signal_event.wait(), timeout=min(poll_ms, remaining_ms) / 1000.0)
+                except asyncio.TimeoutError:
+                    pass
+                poll_ms = min(poll_ms * 2, 50)
 
         # Re-check delayed signals after waiting.
         if self._external_script_requests:
@@ -1467,7 +1639,7 @@ class AsyncBrowserHarness:
                 details=f"Executed: navigation:{urls}; payload={payload_html!r}",
             )
 
-        hook = await _hook_details()
+        hook = await self._hook_details()
         if hook:
             return VectorResult(
                 executed=True,
@@ -1489,7 +1661,66 @@ class AsyncBrowserHarness:
                 signal="http_leak",
             )
 
-        return VectorResult(executed=False, details="No execution detected")
+        return _NO_EXECUTION_RESULT
+
+    async def run_many(
+        self,
+        cases: Sequence[tuple[str, str, PayloadContext]],
+        *,
+        timeout_ms: int = 1500,
+        concurrency: int = 4,
+    ) -> list[VectorResult]:
+        """Run `(payload_html, sanitized_html, payload_context)` cases concurrently.
+
+        Up to `concurrency` pages share this harness's browser. Each page comes
+        from `Browser.new_page()`, which implicitly creates a fresh browser context
+        for it, so lanes don't share cookies/storage; each also has its own
+        listeners and signal state. Results are returned in input order.
+        """
+
+        if self._browser_instance is None or self._page is None:
+            raise RuntimeError("Harness not initialized")
+
+        results: list[VectorResult | None] = [None] * len(cases)
+        pending = iter(enumerate(cases))
+
+        async def _drain(lane: "AsyncBrowserHarness") -> None:
+            # The iterator is shared by all lanes; each pulls its next case when idle.
+            for i, (payload_html, sanitized_html, payload_context) in pending:
+                results[i] = await lane.run(
+                    payload_html=payload_html,
+                    sanitized_html=sanitized_html,
+                    payload_context=payload_context,
+                    timeout_ms=timeout_ms,
+                )
+
+        lanes: list[AsyncBrowserHarness] = [self]
+        tasks: list[asyncio.Future[None]] = []
+        try:
+            for _ in range(max(1, min(concurrency, len(cases))) - 1):
+                lane = AsyncBrowserHarness(browser=self._browser_name, headless=self._headless)
+                lane._timeout_error = self._timeout_error
+                lane._page = await self._browser_instance.new_page()
+                lanes.append(lane)
+                await lane._setup_page()
+            tasks = [asyncio.ensure_future(_drain(lane)) for lane in lanes]
+            await asyncio.gather(*tasks)
+        finally:
+            # If one lane failed, stop the others (and collect their outcome)
+            # before their pages are closed underneath them.
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for lane in lanes[1:]:
+                try:
+                    await lane._page.close()
+                except Exception:
+                    pass
+
+        if any(r is None for r in results):  # pragma: no cover
+            raise RuntimeError("run_many finished without a result for every case")
+        return cast("list[VectorResult]", results)
 
 
 def run_vector(
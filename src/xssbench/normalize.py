@@ -9,9 +9,18 @@ _ASCII_WS_RE = re.compile(r"[\t\n\r\f\v ]+")
 
 
 def _normalize_newlines(s: str) -> str:
+    if "\r" not in s:
+        return s
     return s.replace("\r\n", "\n").replace("\r", "\n")
 
 
+def _nfkc(s: str) -> str:
+    # NFKC is a no-op on pure ASCII, which is the common case for payloads.
+    if s.isascii():
+        return s
+    return unicodedata.normalize("NFKC", s)
+
+
 def _collapse_ascii_whitespace_to_space(s: str) -> str:
     return _ASCII_WS_RE.sub(" ", s)
 
@@ -28,7 +37,7 @@ def _maybe_lowercase_url_scheme(value: str) -> str:
 
 def _normalize_attr_value(raw_value: str) -> str:
     v = html.unescape(raw_value)
-    v = unicodedata.normalize("NFKC", v)
+    v = _nfkc(v)
     v = _normalize_newlines(v)
     v = v.strip()
     v = _collapse_ascii_whitespace_to_space(v)
@@ -270,9 +279,10 @@ def normalize_payload(payload: str) -> str:
     if payload is None:  # type: ignore[truthy-bool]
         payload = ""
 
-    s = str(payload)
-    s = s.replace("\x00", "")
-    s = unicodedata.normalize("NFKC", s)
+    s = payload if isinstance(payload, str) else str(payload)
+    if "\x00" in s:
+        s = s.replace("\x00", "")
+    s = _nfkc(s)
     s = _normalize_newlines(s)
     s = s.strip()
 
@@ -328,7 +338,7 @@ def normalize_payload(payload: str) -> str:
             j = len(s)
         text = s[i:j]
         text = html.unescape(text)
-        text = unicodedata.normalize("NFKC", text)
+        text = _nfkc(text)
         text = _normalize_newlines(text)
         text = _collapse_ascii_whitespace_to_space(text)
         out.append(text)
@@ -152,6 +152,37 @@ def test_load_vectors_accepts_meta_wrapper() -> None:
     assert [v.id for v in vectors] == ["v1"]
 
 
+def test_load_vectors_preserves_file_order_and_rejects_cross_file_duplicates() -> None:
+    from xssbench.bench import load_vectors
+
+    def _file(ids: list[str]) -> str:
+        return json.dumps(
+            {
+                "schema": "xssbench.vectorfile.v1",
+                "vectors": [
+                    {"id": i, "expected_tags": [], "description": "d", "payload_html": "<b>x</b>"} for i in ids
+                ],
+            }
+        )
+
+    with tempfile.TemporaryDirectory() as td:
+        paths = []
+        for n, ids in enumerate([["a", "b"], ["c"], ["d", "e"]]):
+            p = Path(td) / f"v{n}.json"
+            p.write_text(_file(ids), encoding="utf-8")
+            paths.append(p)
+        assert [v.id for v in load_vectors(paths)] == ["a", "b", "c", "d", "e"]
+
+        dup = Path(td) / "dup.json"
+        dup.write_text(_file(["c"]), encoding="utf-8")
+        try:
+            load_vectors([*paths, dup])
+        except ValueError as exc:
+            assert "Duplicate vector id+context: c@html" in str(exc)
+        else:
+            raise AssertionError("Expected ValueError")
+
+
 def test_load_vectors_accepts_bare_tag_expected_tags() -> None:
     from xssbench.bench import load_vectors
 
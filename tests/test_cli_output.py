@@ -35,3 +35,69 @@ def test_cli_prints_sanitized_html_for_lossy_even_if_empty() -> None:
     assert "sanitizer_input_html" in out
     # The key requirement: even empty strings are printed.
     assert "sanitized_html=''" in out
+
+
+def test_json_out_bytes_keep_key_order_and_are_newline_terminated() -> None:
+    import json
+
+    from xssbench.cli import _dump_json_bytes
+
+    # Callers pass keys pre-sorted; the dump itself must not reorder them.
+    data = _dump_json_bytes({"b": 1, "a": ["<script>", "é"]})
+    assert data.endswith(b"\n")
+    assert json.loads(data) == {"a": ["<script>", "é"], "b": 1}
+    assert data.index(b'"b"') < data.index(b'"a"')
+
+
+def test_json_out_bytes_match_stdlib_escaping() -> None:
+    import json
+    from unittest import mock
+
+    import xssbench.cli as cli
+
+    data = {"a": ["<script>", "é", "\u2028", "\n\x01\x7f", "😀"], "b": {"c": [], "d": {}}, "e": 1.5, "f": None}
+    expected = (json.dumps(data, indent=2) + "\n").encode("utf-8")
+    with mock.patch.object(cli, "orjson", None):
+        assert cli._dump_json_bytes(data) == expected
+    assert cli._dump_json_bytes(data) == expected
+    assert cli._dump_json_bytes({"a": "\ud800"}) == b'{\n  "a": "\\ud800"\n}\n'
+
+
+def test_repr_truncated_limits_long_values() -> None:
+    from xssbench.cli import _repr_truncated
+
+    assert _repr_truncated("abc") == "'abc'"
+    out = _repr_truncated("x" * 10_000, limit=20)
+    assert out == "'" + "x" * 16 + "..."
+    assert len(out) == 20
+
+
+def test_fail_fast_block_lists_hit_and_html() -> None:
+    from contextlib import redirect_stderr
+
+    from xssbench.cli import _write_fail_fast
+
+    r = BenchCaseResult(
+        sanitizer="noop",
+        browser="chromium",
+        vector_id="v1",
+        payload_context="html",
+        run_payload_context="html",
+        outcome="xss",
+        executed=True,
+        lossy=False,
+        lossy_details="",
+        details="hook",
+        sanitizer_input_html="<img src=x onerror=alert(1)>",
+        sanitized_html="<img src=x onerror=alert(1)>",
+    )
+
+    buf = io.StringIO()
+    with redirect_stderr(buf):
+        _write_fail_fast(r, sanitized_html_limit=2000)
+
+    assert buf.getvalue().splitlines() == [
+        "FAIL-FAST: noop / chromium / v1 (html): hook",
+        "sanitized_html='<img src=x onerror=alert(1)>'",
+        "sanitizer_input_html='<img src=x onerror=alert(1)>'",
+    ]
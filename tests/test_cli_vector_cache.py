@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import tempfile
+
+from xssbench.bench import load_vectors
+from xssbench.cli import _load_vectors_cached
+
+
+def test_vector_cache_round_trips_and_invalidates_on_change() -> None:
+    payload = {
+        "schema": "xssbench.vectorfile.v1",
+        "vectors": [
+            {
+                "id": "v1",
+                "description": "d",
+                "payload_html": "<a href=x style='color:red'>x</a>",
+                "expected_tags": ["a[href, style]"],
+            },
+            {
+                "id": "v2",
+                "description": "d",
+                "payload_html": "<base href=//x>",
+                "payload_context": "http_leak",
+                "sanitizer_allow_tags": ["base[href]"],
+            },
+        ],
+    }
+
+    with tempfile.TemporaryDirectory() as td:
+        p = Path(td) / "vectors.json"
+        p.write_text(json.dumps(payload), encoding="utf-8")
+        cache_dir = Path(td) / "compiled"
+
+        first = _load_vectors_cached([str(p)], cache_dir=cache_dir)
+        assert len(list(cache_dir.glob("*.marshal"))) == 1
+
+        cached = _load_vectors_cached([str(p)], cache_dir=cache_dir)
+        assert cached == first == load_vectors([p])
+
+        payload["vectors"][0]["description"] = "changed description"
+        p.write_text(json.dumps(payload), encoding="utf-8")
+        changed = _load_vectors_cached([str(p)], cache_dir=cache_dir)
+        assert changed[0].description == "changed description"
+        # The stale entry is replaced, not kept alongside the new one.
+        assert len(list(cache_dir.glob("*.marshal"))) == 1
+
+
+def test_vector_cache_key_tracks_sanitizer_policy_module() -> None:
+    from unittest import mock
+
+    import xssbench.cli as cli
+
+    with tempfile.TemporaryDirectory() as td:
+        vectors_path = Path(td) / "vectors.json"
+        vectors_path.write_text("{}", encoding="utf-8")
+        policy_path = Path(td) / "sanitizers.py"
+        policy_path.write_text("A = 1\n", encoding="utf-8")
+
+        with mock.patch.object(cli.sanitizers_module, "__file__", str(policy_path)):
+            before = cli._vector_cache_key([str(vectors_path)])
+            policy_path.write_text("A = 12\n", encoding="utf-8")
+            after = cli._vector_cache_key([str(vectors_path)])
+
+    assert before != after
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from urllib.parse import urlsplit
+
+from xssbench.harness import _filter_navigation_urls_for_execution
+from xssbench.harness import _has_javascript_href
+from xssbench.harness import _scheme_netloc
+
+
+def test_filter_navigation_urls_drops_benign_navigations() -> None:
+    urls = [
+        "",
+        "about:blank",
+        "about:srcdoc",
+        "chrome-error://chromewebdata/",
+        "http://xssbench.local/#frag",
+        "http://xssbench.local/",
+        "http://xssbench.local/next",
+        "javascript:alert(1)",
+    ]
+    assert _filter_navigation_urls_for_execution(
+        urls, base_url="http://xssbench.local/", payload_context="html", expected_href_click_url=None
+    ) == ["http://xssbench.local/", "http://xssbench.local/next", "javascript:alert(1)"]
+
+
+def test_filter_navigation_urls_ignores_expected_href_click() -> None:
+    urls = ["http://example.com/", "http://example.com/other"]
+    assert _filter_navigation_urls_for_execution(
+        urls,
+        base_url="http://xssbench.local/",
+        payload_context="href",
+        expected_href_click_url="http://example.com/",
+    ) == ["http://example.com/other"]
+
+
+def test_has_javascript_href() -> None:
+    assert _has_javascript_href(["http://xssbench.local/", " JavaScript:alert(1)"])
+    assert not _has_javascript_href(["http://xssbench.local/#x", "", None])
+    assert not _has_javascript_href([])
+
+
+def test_scheme_netloc_matches_urlsplit() -> None:
+    urls = [
+        "http://xssbench.local/",
+        "https://Example.com:8443/a?b#c",
+        "HTTP://xssbench.local",
+        "http://user:pw@host?x",
+        "http://host#frag",
+        "http:relative",
+        "data:text/html,<b>",
+        "blob:http://xssbench.local/uuid",
+        "javascript:fetch('http://x/')",
+        "about:blank",
+        "",
+    ]
+    for url in urls:
+        parts = urlsplit(url)
+        assert _scheme_netloc(url) == (parts.scheme, parts.netloc), url
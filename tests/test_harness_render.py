@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from xssbench.harness import _meta_refresh_url
+from xssbench.harness import render_html_document
+
+
+def test_meta_refresh_delay_is_rewritten_to_zero() -> None:
+    doc = render_html_document(
+        sanitized_html='<META HTTP-EQUIV="Refresh" CONTENT="10; url=http://example.com/">',
+        payload_context="html",
+    )
+    assert 'CONTENT="0; url=http://example.com/"' in doc
+    assert "10;" not in doc
+
+
+def test_meta_refresh_url_parsing() -> None:
+    assert _meta_refresh_url("10; url=http://example.com/ ") == "http://example.com/"
+    assert _meta_refresh_url(" 5 URL = 'x' ") == "'x'"
+    assert _meta_refresh_url("url=x") == "x"
+    assert _meta_refresh_url("7;") == ""
+    assert _meta_refresh_url("") == ""
+    assert _meta_refresh_url("5, url=x") is None
+    assert _meta_refresh_url("5; x") is None
+    assert _meta_refresh_url("url=a\nb") is None
+
+
+def test_meta_without_refresh_is_left_alone() -> None:
+    html = '<meta http-equiv="content-type" content="10; url=x"><p>refresh</p>'
+    assert html in render_html_document(sanitized_html=html, payload_context="html")
+
+
+def test_payload_is_inserted_verbatim_at_every_placeholder() -> None:
+    payload = "<base href=//x>$payload ${prelude} {x} %s"
+    doc = render_html_document(sanitized_html=payload, payload_context="http_leak")
+    assert doc.count(payload) == 2
+    assert "__XSSBENCH_" not in doc
+
+
+def test_http_leak_body_payload_uses_outer_template() -> None:
+    doc = render_html_document(sanitized_html="  <BODY background=//x>", payload_context="http_leak")
+    assert doc.count("<BODY background=//x>") == 1
+    assert '<div id="root">' not in doc
+
+
+def test_meta_refresh_breaking_out_of_js_context_is_still_sped_up() -> None:
+    doc = render_html_document(
+        sanitized_html="</script><meta http-equiv=refresh content='9; url=javascript:alert(1)'>",
+        payload_context="js",
+    )
+    assert "content='0; url=javascript:alert(1)'" in doc
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from xssbench.harness import BrowserHarness
+
+
+class _FakeRoute:
+    def __init__(self, url: str, resource_type: str) -> None:
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.outcome = ""
+
+    def fulfill(self, **kwargs) -> None:
+        self.outcome = "fulfill"
+
+    def abort(self) -> None:
+        self.outcome = "abort"
+
+
+def test_handle_route_classifies_requests() -> None:
+    harness = BrowserHarness(browser="chromium")
+    harness._current_html = b"<p>x</p>"
+
+    requests = [
+        ("http://xssbench.local/", "document", "fulfill"),
+        ("http://example.com/", "document", "abort"),
+        ("https://evil.example/x.js", "script", "abort"),
+        ("http://xssbench.local/local.js", "script", "abort"),
+        ("http://evil.example/x.png", "image", "abort"),
+        ("http://xssbench.local/local.png", "image", "abort"),
+        ("data:image/png;base64,AAAA", "image", "abort"),
+        ("blob:http://xssbench.local/1234", "fetch", "abort"),
+        ("data:text/javascript,alert(1)", "script", "abort"),
+    ]
+    for url, rtype, expected in requests:
+        route = _FakeRoute(url, rtype)
+        harness._handle_route(route)
+        assert route.outcome == expected, (url, rtype, route.outcome)
+
+    assert harness._navigation_requests == ["http://example.com/"]
+    assert harness._external_script_requests == [
+        "https://evil.example/x.js",
+        "http://xssbench.local/local.js",
+    ]
+    assert harness._external_network_requests == [("image", "http://evil.example/x.png")]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from unittest import mock
+
+from xssbench.harness import AsyncBrowserHarness, VectorResult
+
+
+class _FakePage:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self) -> None:
+        self.pages: list[_FakePage] = []
+
+    async def new_page(self) -> _FakePage:
+        page = _FakePage()
+        self.pages.append(page)
+        return page
+
+
+def test_run_many_keeps_input_order_and_closes_extra_pages() -> None:
+    lanes_used: set[int] = set()
+
+    async def _fake_setup_page(self) -> None:
+        return None
+
+    async def _fake_run(self, *, payload_html, sanitized_html, payload_context, timeout_ms) -> VectorResult:
+        lanes_used.add(id(self))
+        # Later cases finish first, so completion order differs from input order.
+        await asyncio.sleep(0.001 * (10 - int(payload_html)))
+        return VectorResult(executed=False, details=f"{payload_html}:{payload_context}:{timeout_ms}")
+
+    harness = AsyncBrowserHarness(browser="chromium")
+    browser = _FakeBrowser()
+    harness._browser_instance = browser
+    harness._page = _FakePage()
+
+    cases = [(str(i), str(i), "html") for i in range(10)]
+    with (
+        mock.patch.object(AsyncBrowserHarness, "_setup_page", _fake_setup_page),
+        mock.patch.object(AsyncBrowserHarness, "run", _fake_run),
+    ):
+        results = asyncio.run(harness.run_many(cases, timeout_ms=7, concurrency=3))
+
+    details = [r.details for r in results]
+    assert details == [f"{i}:html:7" for i in range(10)], details
+    assert len(lanes_used) == 3
+    assert len(browser.pages) == 2
+    assert all(p.closed for p in browser.pages)
+    assert harness._page.closed is False
+
+
+def test_run_many_stops_other_lanes_when_one_fails() -> None:
+    running: set[str] = set()
+    running_at_close: list[set[str]] = []
+
+    class _TrackingPage(_FakePage):
+        async def close(self) -> None:
+            running_at_close.append(set(running))
+            await super().close()
+
+    class _TrackingBrowser(_FakeBrowser):
+        async def new_page(self) -> _FakePage:
+            page = _TrackingPage()
+            self.pages.append(page)
+            return page
+
+    async def _fake_setup_page(self) -> None:
+        return None
+
+    async def _fake_run(self, *, payload_html, sanitized_html, payload_context, timeout_ms) -> VectorResult:
+        running.add(payload_html)
+        try:
+            if payload_html == "boom":
+                await asyncio.sleep(0.01)
+                raise ValueError("boom")
+            await asyncio.sleep(10)
+            return VectorResult(executed=False, details=payload_html)
+        finally:
+            running.discard(payload_html)
+
+    harness = AsyncBrowserHarness(browser="chromium")
+    browser = _TrackingBrowser()
+    harness._browser_instance = browser
+    harness._page = _FakePage()
+
+    cases = [("slow1", "", "html"), ("boom", "", "html"), ("slow2", "", "html")]
+    with (
+        mock.patch.object(AsyncBrowserHarness, "_setup_page", _fake_setup_page),
+        mock.patch.object(AsyncBrowserHarness, "run", _fake_run),
+    ):
+        try:
+            asyncio.run(harness.run_many(cases, concurrency=3))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected the failing lane's error to propagate")
+
+    assert running_at_close == [set(), set()], running_at_close
+    assert all(p.closed for p in browser.pages)
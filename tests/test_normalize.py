@@ -54,3 +54,9 @@ def test_malformed_tag_like_input_does_not_hang() -> None:
     out = normalize_payload(s)
     assert isinstance(out, str)
     assert len(out) > 0
+
+
+def test_normalize_nfkc_still_applied_to_non_ascii() -> None:
+    a = "<img src=x onerror=ａlert(1)>ｘ"
+    b = "<img src=x onerror=alert(1)>x"
+    assert normalize_payload(a) == normalize_payload(b)